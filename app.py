@@ -1,11 +1,29 @@
 import os
-import requests
-from PIL import Image, ImageDraw, ImageFont, ImageFilter
-from io import BytesIO
-from flask import Flask, send_file, abort, make_response
+from PIL import Image
+from flask import Flask, abort, g, make_response, request
 from dotenv import load_dotenv
 import time
 import traceback
+import json
+import hashlib
+import re
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from asset_cache import AssetCache
+from http_client import UPSTREAM_FETCH_ENABLED, http_post
+from singleflight import SingleFlight
+from rate_limit import TokenBucket, backoff_delay
+from user_registry import UserRegistry, UserState
+from text_layout import text_bbox
+from fonts import FONTS
+from encoding import MIMETYPES, encode_image, negotiate_format
+from prerender import PrerenderScheduler
+from list_mirror import ListMirror
+from metrics import METRICS, server_timing
+from circuit_breaker import CircuitBreaker
+from card_engine import card_assets, font_specs, render_card
+import deadline
 
 load_dotenv()
 
@@ -13,321 +31,511 @@ app = Flask(__name__)
 
 ANILIST_USERNAME = os.getenv("ANILIST_USERNAME")
 ANILIST_TOKEN = os.getenv("ANILIST_TOKEN")
-ANILIST_API_URL = 'https://graphql.anilist.co'
+ANILIST_ALLOWED_USERS = {u.strip().lower() for u in os.getenv("ANILIST_ALLOWED_USERS", "").split(",") if u.strip()}
+USERNAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]{2,20}$")
+ANILIST_API_URL = os.getenv("ANILIST_API_URL", 'https://graphql.anilist.co')
 
 ORANGE_ACCENT = (252, 146, 46) 
 DESCRIPTION_BOX_BG = (34, 39, 49) 
 BRIGHT_TEXT = (235, 235, 240)
 MEDIUM_GREY_TEXT = (180, 185, 190)
 LIGHT_GREY_TEXT = (200, 205, 210)
+TITLE_FONT = "Montserrat-Bold.ttf"
+DETAILS_FONT = "OpenSans-Regular.ttf"
 
 
 STYLE_CONFIG = {
-    "image_width_activity": 340,
-    "image_height_activity": 100,
-    "fallback_background_color": (30, 33, 38),
-    "text_color_title_activity": BRIGHT_TEXT,
-    "text_color_details_activity": MEDIUM_GREY_TEXT,
-    "accent_color_activity": ORANGE_ACCENT, 
-    "cover_image_size_activity": (70, 95), 
-    "cover_corner_radius_activity": 5,
-    "font_title_name": "Montserrat-Bold.ttf",
-    "font_details_name": "OpenSans-Regular.ttf",
-    "font_size_title_activity": 16,
-    "font_size_details_activity": 12,
-    "text_overlay_color_activity": (15, 17, 20, 235),
-    "text_overlay_padding_activity": 8,
-    "text_overlay_corner_radius_activity": 4,
-    "banner_blur_radius": 1.5, 
-    "banner_dim_color": (0, 0, 0, 120),
-    "image_width_goal": 400,
-    "image_height_goal": 90, 
-    "background_color_goal": DESCRIPTION_BOX_BG, 
-    "text_color_title_goal": BRIGHT_TEXT,
-    "text_color_details_goal": LIGHT_GREY_TEXT,
-    "font_size_title_goal": 18,
-    "font_size_details_goal": 14,
-    "progress_bar_bg_color": (60, 65, 75),
-    "progress_bar_fill_color": ORANGE_ACCENT, 
-    "progress_bar_height": 18,
-    "progress_bar_corner_radius": 7,
-    "anime_goal_total": 250,
-    "image_width_completed": 420, 
-    "image_height_completed": 110, 
-    "background_completed_color": DESCRIPTION_BOX_BG,
-    "background_dim_overlay_completed": (0, 0, 0, 35),
-    "text_color_title_completed": BRIGHT_TEXT,
-    "text_color_subtitle_completed": ORANGE_ACCENT, 
-    "text_color_score_value_completed": BRIGHT_TEXT,
-    "text_color_score_suffix_completed": LIGHT_GREY_TEXT,
-    "cover_completed_size": (70, 100), 
-    "cover_completed_corner_radius": 5,
-    "font_size_title_completed": 17, 
-    "font_size_subtitle_completed": 12,
-    "font_size_score_value_completed": 26, 
-    "font_size_score_suffix_completed": 13,
-    "padding_completed": 12, 
-    "padding_general": 15, 
-    "line_spacing_title_details": 4, 
-    "line_spacing_details": 2,
     "request_timeout": 20,
+    "asset_deadline": 20,
+    "request_deadline": 8,
+    "anilist_deadline_share": 0.6,
+    "max_scale": 3,
+    "composite_gap": 8,
+    "composite_background": (0, 0, 0, 0),
+    "grid_max_items": 10,
+}
+
+COMPLETED_CARD_SPEC = {
+    "kind": "completed",
+    "size": (420, 110),
+    "padding": 12,
+    "background": DESCRIPTION_BOX_BG,
+    "cover_size": (70, 100),
+    "cover_radius": 5,
+    "fonts": {"title": (TITLE_FONT, 17, True), "subtitle": (DETAILS_FONT, 12, False), "score_value": (TITLE_FONT, 26, True), "score_suffix": (DETAILS_FONT, 13, False)},
+    "colors": {"title": BRIGHT_TEXT, "subtitle": ORANGE_ACCENT, "score_value": BRIGHT_TEXT, "score_suffix": LIGHT_GREY_TEXT},
+    "line_spacing_title": 4,
+    "line_spacing_details": 2,
     "title_max_lines": 2,
+    "subtitle_text": "Recently Completed",
+    "empty_text": "No recently completed anime.",
+}
+CARD_SPECS = {
+    "activity": {
+        "kind": "activity",
+        "size": (340, 100),
+        "padding": 15,
+        "background": (30, 33, 38),
+        "cover_size": (70, 95),
+        "cover_radius": 5,
+        "scrim_color": (15, 17, 20, 235),
+        "scrim_padding": 8,
+        "scrim_radius": 4,
+        "banner_dim": (0, 0, 0, 120),
+        "banner_blur": 1.5,
+        "fonts": {"title": (TITLE_FONT, 16, True), "details": (DETAILS_FONT, 12, False)},
+        "colors": {"title": BRIGHT_TEXT, "details": MEDIUM_GREY_TEXT, "accent": ORANGE_ACCENT},
+        "line_spacing_title": 4,
+        "line_spacing_details": 2,
+        "empty_text": "No recent {media} data",
+    },
+    "goal": {
+        "kind": "goal",
+        "size": (400, 90),
+        "padding": 15,
+        "background": DESCRIPTION_BOX_BG,
+        "fonts": {"title": (TITLE_FONT, 18, True), "details": (DETAILS_FONT, 14, False)},
+        "colors": {"title": BRIGHT_TEXT, "details": LIGHT_GREY_TEXT},
+        "title_text": "Anime Completion Goal",
+        "error_text": "Error fetching data",
+        "goal_total": 250,
+        "bar_height": 18,
+        "bar_radius": 7,
+        "bar_color": (60, 65, 75),
+        "bar_fill_color": ORANGE_ACCENT,
+    },
+    "completed": COMPLETED_CARD_SPEC,
+    "grid": {
+        "kind": "grid",
+        "padding": 12,
+        "gap": 8,
+        "columns": 5,
+        "background": DESCRIPTION_BOX_BG,
+        "cover_size": (70, 100),
+        "cover_radius": 5,
+        "fonts": {"header": (DETAILS_FONT, 13, False), "score": (TITLE_FONT, 11, True)},
+        "colors": {"header": ORANGE_ACCENT, "score": BRIGHT_TEXT},
+        "header_text": "Recently Completed",
+        "badge_color": (15, 17, 20, 220),
+        "badge_padding": 3,
+        "empty": COMPLETED_CARD_SPEC,
+    },
 }
 
-pil_default_font = ImageFont.load_default()
-FONT_TITLE_ACTIVITY, FONT_DETAILS_ACTIVITY = pil_default_font, pil_default_font
-FONT_TITLE_GOAL, FONT_DETAILS_GOAL = pil_default_font, pil_default_font
-FONT_TITLE_COMPLETED, FONT_SUBTITLE_COMPLETED = pil_default_font, pil_default_font
-FONT_SCORE_VALUE_COMPLETED, FONT_SCORE_SUFFIX_COMPLETED = pil_default_font, pil_default_font
-
-custom_font_title_path = STYLE_CONFIG["font_title_name"]
-custom_font_details_path = STYLE_CONFIG["font_details_name"]
-custom_fonts_loaded_successfully = False
-try:
-    FONT_TITLE_ACTIVITY = ImageFont.truetype(custom_font_title_path, STYLE_CONFIG["font_size_title_activity"])
-    FONT_DETAILS_ACTIVITY = ImageFont.truetype(custom_font_details_path, STYLE_CONFIG["font_size_details_activity"])
-    FONT_TITLE_GOAL = ImageFont.truetype(custom_font_title_path, STYLE_CONFIG["font_size_title_goal"])
-    FONT_DETAILS_GOAL = ImageFont.truetype(custom_font_details_path, STYLE_CONFIG["font_size_details_goal"])
-    FONT_TITLE_COMPLETED = ImageFont.truetype(custom_font_title_path, STYLE_CONFIG["font_size_title_completed"])
-    FONT_SUBTITLE_COMPLETED = ImageFont.truetype(custom_font_details_path, STYLE_CONFIG["font_size_subtitle_completed"])
-    FONT_SCORE_VALUE_COMPLETED = ImageFont.truetype(custom_font_title_path, STYLE_CONFIG["font_size_score_value_completed"])
-    FONT_SCORE_SUFFIX_COMPLETED = ImageFont.truetype(custom_font_details_path, STYLE_CONFIG["font_size_score_suffix_completed"])
-    custom_fonts_loaded_successfully = True
-except IOError:
-    pass
-if not custom_fonts_loaded_successfully:
-    try:
-        def get_arial_font(size, is_bold=False):
-            fn = "arialbd.ttf" if is_bold else "arial.ttf"; return ImageFont.truetype(fn, size)
-        FONT_TITLE_ACTIVITY = get_arial_font(STYLE_CONFIG["font_size_title_activity"], True)
-        FONT_DETAILS_ACTIVITY = get_arial_font(STYLE_CONFIG["font_size_details_activity"])
-    except IOError: pass
-
-def add_rounded_corners(im, rad):
-    mask = Image.new('L', im.size, 0); draw = ImageDraw.Draw(mask)
-    draw.rounded_rectangle((0, 0) + im.size, radius=rad, fill=255); im.putalpha(mask); return im
-def crop_to_aspect(image, aspect_w, aspect_h):
-    img_w, img_h = image.size; target_aspect = aspect_w / aspect_h; img_aspect = img_w / img_h
-    if img_aspect > target_aspect: new_w=int(target_aspect*img_h); off=(img_w-new_w)//2; image=image.crop((off,0,off+new_w,img_h))
-    elif img_aspect < target_aspect: new_h=int(img_w/target_aspect); off=(img_h-new_h)//2; image=image.crop((0,off,img_w,off+new_h))
-    return image
-def get_anilist_data(query, variables, log_prefix="API_CALL"):
-    headers = {'Authorization':f'Bearer {ANILIST_TOKEN}','Content-Type':'application/json','Accept':'application/json'}
-    try:
-        response = requests.post(ANILIST_API_URL,json={'query':query,'variables':variables},headers=headers,timeout=STYLE_CONFIG["request_timeout"])
-        response.raise_for_status(); data=response.json(); return data
-    except Exception as e: return None
-
-def get_last_updated_media_for_activity(media_type="ANIME"):
-    log_prefix = f"GLUM Activity - {media_type}"; query = '''query ($userName: String, $type: MediaType, $sort: [MediaListSort]) { MediaListCollection(userName: $userName, type: $type, sort: $sort, forceSingleCompletedList: true) { lists { name entries { updatedAt progress media { id title { romaji english } coverImage { large } bannerImage type format } } } } }'''
-    variables = {'userName': ANILIST_USERNAME, 'type': media_type, 'sort': 'UPDATED_TIME_DESC'}
-    data = get_anilist_data(query, variables, log_prefix);
-    if not data: return None
-    all_entries = []; collection = data.get('data', {}).get('MediaListCollection', {})
-    if collection and collection.get('lists'):
-        for lst in collection['lists']:
-            if lst and lst.get('entries'): all_entries.extend(lst['entries'])
-    if not all_entries: return None
-    all_entries.sort(key=lambda x: x.get('updatedAt', 0), reverse=True)
-    return all_entries[0]
-
-def generate_activity_image(media_entry, media_type_for_log="MEDIA"):
-    cfg = STYLE_CONFIG; w, h = cfg["image_width_activity"], cfg["image_height_activity"]; FNT_T, FNT_D = FONT_TITLE_ACTIVITY, FONT_DETAILS_ACTIVITY
-    base_img = None; media = media_entry.get('media') if media_entry else None; banner_url = media.get('bannerImage') if media else None
-    if banner_url:
-        try:
-            banner_response = requests.get(banner_url, stream=True, timeout=cfg["request_timeout"]); banner_response.raise_for_status()
-            banner_raw = Image.open(BytesIO(banner_response.content)).convert("RGBA")
-            cropped_banner = crop_to_aspect(banner_raw, w, h)
-            resized_banner = cropped_banner.resize((w, h), Image.Resampling.LANCZOS)
-            banner_dim_color = cfg.get("banner_dim_color", (0,0,0,0))
-            if banner_dim_color[3] > 0:
-                dim_layer_for_banner = Image.new('RGBA', resized_banner.size, (0,0,0,0))
-                draw_banner_dim = ImageDraw.Draw(dim_layer_for_banner)
-                draw_banner_dim.rectangle([(0,0), resized_banner.size], fill=banner_dim_color)
-                base_img = Image.alpha_composite(resized_banner, dim_layer_for_banner)
-            else: base_img = resized_banner
-            if cfg.get("banner_blur_radius", 0) > 0: base_img = base_img.filter(ImageFilter.GaussianBlur(radius=cfg["banner_blur_radius"]))
-        except Exception as e: base_img = None
-    if base_img is None: base_img = Image.new('RGBA', (w, h), cfg["fallback_background_color"] + (255,))
-    final_img = base_img.copy(); draw = ImageDraw.Draw(final_img)
-    scrim_x0 = cfg["padding_general"] + cfg["cover_image_size_activity"][0] + cfg["padding_general"] - cfg["text_overlay_padding_activity"]
-    scrim_y0 = cfg["padding_general"] - cfg["text_overlay_padding_activity"]
-    scrim_w = w - scrim_x0 - cfg["padding_general"] + cfg["text_overlay_padding_activity"]
-    scrim_h = h - 2 * (cfg["padding_general"] - cfg["text_overlay_padding_activity"])
-    overlay_img_draw = Image.new('RGBA', final_img.size, (0,0,0,0)); draw_overlay_rect = ImageDraw.Draw(overlay_img_draw)
-    draw_overlay_rect.rounded_rectangle((scrim_x0, scrim_y0, scrim_x0 + scrim_w, scrim_y0 + scrim_h), radius=cfg["text_overlay_corner_radius_activity"], fill=cfg["text_overlay_color_activity"])
-    final_img = Image.alpha_composite(final_img, overlay_img_draw); draw = ImageDraw.Draw(final_img)
-    if not media:
-        err_txt = f"No recent {media_type_for_log.lower()} data"; bb=draw.textbbox((0,0),err_txt,font=FNT_T); tw,th=bb[2]-bb[0],bb[3]-bb[1]
-        draw.text(((w-tw)/2,(h-th)/2),err_txt,font=FNT_T,fill=cfg["text_color_title_activity"]); return final_img.convert("RGB")
-    cover_url = media.get('coverImage', {}).get('large'); cx,cy = cfg["padding_general"],(h-cfg["cover_image_size_activity"][1])//2
-    if cover_url:
+CACHE_CONFIG = {
+    "anilist_max_stale": int(os.getenv("ANILIST_CACHE_MAX_STALE", 3600)),
+    "ttl_snapshot": int(os.getenv("ANILIST_CACHE_TTL_SNAPSHOT", 60)),
+    "render_max_entries": int(os.getenv("RENDER_CACHE_MAX_ENTRIES", 16)),
+    "render_ttl": int(os.getenv("RENDER_CACHE_TTL", 3600)),
+    "card_cache_control": os.getenv("CARD_CACHE_CONTROL", "public, max-age=60, stale-while-revalidate=300"),
+    "partial_cache_control": os.getenv("CARD_PARTIAL_CACHE_CONTROL", "no-store"),
+    "max_users": int(os.getenv("USER_CACHE_MAX_USERS", 1000)),
+    "user_memory_budget": int(os.getenv("USER_CACHE_MEMORY_BUDGET", 64 * 1024 * 1024)),
+}
+ANILIST_CLIENT_CONFIG = {
+    "rate_per_minute": int(os.getenv("ANILIST_RATE_PER_MINUTE", 90)),
+    "burst": int(os.getenv("ANILIST_RATE_BURST", 30)),
+    "max_queue_wait": float(os.getenv("ANILIST_MAX_QUEUE_WAIT", 2)),
+    "max_retries": int(os.getenv("ANILIST_MAX_RETRIES", 2)),
+    "max_retry_delay": float(os.getenv("ANILIST_MAX_RETRY_DELAY", 5)),
+    "user_rate_per_minute": int(os.getenv("ANILIST_USER_RATE_PER_MINUTE", 20)),
+    "user_rate_burst": int(os.getenv("ANILIST_USER_RATE_BURST", 5)),
+    "breaker_failures": int(os.getenv("ANILIST_BREAKER_FAILURES", 5)),
+    "breaker_reset": float(os.getenv("ANILIST_BREAKER_RESET", 30)),
+}
+MIRROR_CONFIG = {
+    "path": os.getenv("ANILIST_MIRROR_DB"),
+    "full_sync_interval": int(os.getenv("ANILIST_MIRROR_FULL_SYNC_INTERVAL", 86400)),
+    "full_page_size": int(os.getenv("ANILIST_MIRROR_FULL_PAGE_SIZE", 50)),
+    "delta_page_size": int(os.getenv("ANILIST_MIRROR_DELTA_PAGE_SIZE", 10)),
+    "sync_workers": int(os.getenv("ANILIST_MIRROR_SYNC_WORKERS", 2)),
+}
+ASSET_CACHE = AssetCache()
+ASSET_EXECUTOR = ThreadPoolExecutor(max_workers=int(os.getenv("ASSET_FETCH_WORKERS", 8)), thread_name_prefix="asset-fetch")
+USERS = UserRegistry(lambda name: UserState(name, CACHE_CONFIG["anilist_max_stale"], CACHE_CONFIG["render_max_entries"], CACHE_CONFIG["render_ttl"],
+                                             ANILIST_CLIENT_CONFIG["user_rate_per_minute"], ANILIST_CLIENT_CONFIG["user_rate_burst"], snapshot_weigher=lambda v: len(json.dumps(v))),
+                     max_users=CACHE_CONFIG["max_users"], memory_budget=CACHE_CONFIG["user_memory_budget"])
+ANILIST_RATE_LIMITER = TokenBucket(ANILIST_CLIENT_CONFIG["rate_per_minute"], ANILIST_CLIENT_CONFIG["burst"])
+ANILIST_FLIGHT = SingleFlight()
+ANILIST_BREAKER = CircuitBreaker(ANILIST_CLIENT_CONFIG["breaker_failures"], ANILIST_CLIENT_CONFIG["breaker_reset"])
+LIST_MIRROR = ListMirror(MIRROR_CONFIG["path"], MIRROR_CONFIG["full_sync_interval"], MIRROR_CONFIG["full_page_size"], MIRROR_CONFIG["delta_page_size"]) if MIRROR_CONFIG["path"] else None
+MIRROR_EXECUTOR = ThreadPoolExecutor(max_workers=MIRROR_CONFIG["sync_workers"], thread_name_prefix="mirror-sync")
+MIRROR_SYNCS = {}
+MIRROR_SYNC_LOCK = threading.Lock()
+RENDER_FLIGHT = SingleFlight()
+CARD_ENCODINGS = {
+    "activity": {"formats": ("webp", "png"), "palette": False},
+    "goal": {"formats": ("png",), "palette": True},
+    "completed": {"formats": ("webp", "png"), "palette": True},
+    "composite": {"formats": ("webp", "png"), "palette": False},
+    "grid": {"formats": ("webp", "png"), "palette": False},
+}
+FORMAT_NEGOTIATION = os.getenv("CARD_FORMAT_NEGOTIATION", "1") == "1"
+PRERENDER_CONFIG = {
+    "enabled": os.getenv("PRERENDER", "0") == "1",
+    "cards": os.getenv("PRERENDER_CARDS", "last_anime:300,last_manga:300,anime_goal_progress:900,recently_completed_anime:600"),
+    "jitter": float(os.getenv("PRERENDER_JITTER", 0.1)),
+}
+STYLE_FINGERPRINT = hashlib.sha256(json.dumps([STYLE_CONFIG, CARD_SPECS], sort_keys=True).encode()).hexdigest()
+if os.getenv("FONT_WARMUP", "0") == "1": FONTS.warm_up([font for spec in CARD_SPECS.values() for font in font_specs(spec)])
+
+def fetch_card_assets(loaders, deadline_s=None):
+    until = time.monotonic() + deadline.budget(deadline_s or STYLE_CONFIG["asset_deadline"]); start = time.perf_counter()
+    run = lambda loader: loader(max(0.1, until - time.monotonic()))
+    futures = {name: ASSET_EXECUTOR.submit(contextvars.copy_context().run, run, loader) for name, loader in loaders.items() if loader}
+    if futures: wait(futures.values(), timeout=max(0, until - time.monotonic()))
+    results = {name: None for name in loaders}
+    for name, fut in futures.items():
+        if fut.done() and fut.exception() is None: results[name] = fut.result()
+        else: fut.cancel(); METRICS.error(f"asset_{name}")
+    METRICS.observe("assets", (time.perf_counter() - start) * 1000)
+    return results, all(results[name] is not None for name in futures)
+def anilist_headers(): return {'Authorization':f'Bearer {ANILIST_TOKEN}','Content-Type':'application/json','Accept':'application/json'}
+def anilist_cache_key(query, variables): return (query, json.dumps(variables, sort_keys=True))
+def _fetch_anilist_data(query, variables, limiter=None):
+    if not UPSTREAM_FETCH_ENABLED.get(): return None
+    headers = anilist_headers(); client_cfg = ANILIST_CLIENT_CONFIG
+    for attempt in range(client_cfg["max_retries"] + 1):
+        if not ANILIST_BREAKER.allow(): METRICS.error("anilist_circuit"); return None
+        timeout = deadline.budget(STYLE_CONFIG["request_timeout"], STYLE_CONFIG["anilist_deadline_share"])
+        if timeout <= 0: METRICS.error("deadline"); return None
+        if limiter is not None and not limiter.acquire(): METRICS.error("user_rate_limit"); return None
+        with METRICS.timer("anilist_queue"): admitted = ANILIST_RATE_LIMITER.acquire(min(client_cfg["max_queue_wait"], timeout))
+        if not admitted: METRICS.error("anilist_queue"); return None
+        start = time.perf_counter()
         try:
-            cover_resp=requests.get(cover_url,stream=True,timeout=cfg["request_timeout"]);cover_resp.raise_for_status()
-            cover_img_data=BytesIO(cover_resp.content);cover_img=Image.open(cover_img_data).convert("RGBA").resize(cfg["cover_image_size_activity"],Image.Resampling.LANCZOS)
-            final_img.paste(add_rounded_corners(cover_img,cfg["cover_corner_radius_activity"]),(cx,cy),cover_img)
-        except Exception as e:draw.rectangle((cx,cy,cx+cfg["cover_image_size_activity"][0],cy+cfg["cover_image_size_activity"][1]),fill=(50,50,60,200))
-    else:draw.rectangle((cx,cy,cx+cfg["cover_image_size_activity"][0],cy+cfg["cover_image_size_activity"][1]),fill=(50,50,60,200))
-    title=media.get('title',{}).get('english') or media.get('title',{}).get('romaji') or "Untitled";prog=media_entry.get('progress',0)
-    prog_lbl="Ep: " if media.get('type')=='ANIME' else "Ch: ";fmt=f"Format: {media.get('format','N/A')}"
-    txt_x=scrim_x0+cfg["text_overlay_padding_activity"];cur_y=scrim_y0+cfg["text_overlay_padding_activity"]
-    max_w_title=scrim_w-2*cfg["text_overlay_padding_activity"]
-    disp_title=title;bbT=draw.textbbox((0,0),disp_title,font=FNT_T);tW=bbT[2]-bbT[0]
-    while tW>max_w_title and len(disp_title)>15:disp_title=disp_title[:-4]+"...";bbT=draw.textbbox((0,0),disp_title,font=FNT_T);tW=bbT[2]-bbT[0]
-    draw.text((txt_x,cur_y),disp_title,font=FNT_T,fill=cfg["text_color_title_activity"]);cur_y+=(bbT[3]-bbT[1])+cfg["line_spacing_title_details"]
-    draw.text((txt_x,cur_y),prog_lbl,font=FNT_D,fill=cfg["text_color_details_activity"]);bbL=draw.textbbox((0,0),prog_lbl,font=FNT_D);lW=bbL[2]-bbL[0]
-    draw.text((txt_x+lW,cur_y),str(prog),font=FNT_D,fill=cfg["accent_color_activity"]);bbP=draw.textbbox((0,0),prog_lbl+str(prog),font=FNT_D);cur_y+=(bbP[3]-bbP[1])+cfg["line_spacing_details"]
-    fmt_bb=draw.textbbox((0,0),fmt,font=FNT_D);fmt_h=fmt_bb[3]-fmt_bb[1]
-    if cur_y+fmt_h<=scrim_y0+scrim_h-cfg["text_overlay_padding_activity"]:
-        draw.text((txt_x,cur_y),fmt,font=FNT_D,fill=cfg["text_color_details_activity"])
-    return final_img.convert("RGB")
-
-def get_completed_anime_count_for_goal():
-    log_prefix="GetGoalCount"; query = """query ($userName: String) { User(name: $userName) { statistics { anime { statuses { status count } } } } }"""
-    variables = {'userName': ANILIST_USERNAME}; data = get_anilist_data(query, variables, log_prefix)
-    if not data: return -1
-    stats = data.get('data',{}).get('User',{}).get('statistics',{}).get('anime',{})
+            response = http_post(ANILIST_API_URL,json={'query':query,'variables':variables},headers=headers,timeout=max(0.1, timeout - (time.perf_counter() - start)))
+        except Exception as e: response = None
+        METRICS.observe("anilist", (time.perf_counter() - start) * 1000)
+        if response is None or response.status_code >= 400: METRICS.error("anilist")
+        if response is None or response.status_code >= 500: ANILIST_BREAKER.record_failure()
+        else: ANILIST_BREAKER.record_success()
+        retry_after = ANILIST_RATE_LIMITER.update_from_headers(response.status_code, response.headers) if response is not None else None
+        if response is None or response.status_code == 429 or response.status_code >= 500:
+            delay = retry_after + backoff_delay(0) if retry_after is not None else backoff_delay(attempt)
+            left = deadline.remaining()
+            if attempt == client_cfg["max_retries"] or delay > client_cfg["max_retry_delay"] or (left is not None and delay >= left): return None
+            time.sleep(delay); continue
+        try: response.raise_for_status(); data=response.json(); return data
+        except Exception as e: METRICS.error("anilist_decode"); return None
+    return None
+def get_anilist_data(query, variables, log_prefix="API_CALL", cache_ttl=None, cache=None, limiter=None):
+    cache_key = anilist_cache_key(query, variables)
+    fetch = lambda: ANILIST_FLIGHT.do(cache_key, lambda: _fetch_anilist_data(query, variables, limiter))
+    if cache is None or not cache_ttl or cache_ttl <= 0: return fetch()
+    return cache.get_or_load(cache_key, fetch, ttl=cache_ttl, revalidate=UPSTREAM_FETCH_ENABLED.get())
+
+USER_SNAPSHOT_QUERY = """
+query ($userName: String) {
+  anime: Page(page: 1, perPage: 1) { mediaList(userName: $userName, type: ANIME, sort: [UPDATED_TIME_DESC]) { updatedAt progress media { id title { romaji english } coverImage { large } bannerImage type format } } }
+  manga: Page(page: 1, perPage: 1) { mediaList(userName: $userName, type: MANGA, sort: [UPDATED_TIME_DESC]) { updatedAt progress media { id title { romaji english } coverImage { large } bannerImage type format } } }
+  completed: Page(page: 1, perPage: %d) { mediaList(userName: $userName, type: ANIME, status: COMPLETED, sort: [UPDATED_TIME_DESC]) { score(format: POINT_100) updatedAt media { id title { romaji english } coverImage { large } type format } } }
+  user: User(name: $userName) { statistics { anime { statuses { status count } } } }
+}""" % STYLE_CONFIG["grid_max_items"]
+
+def get_user_snapshot(username=None):
+    username = username or ANILIST_USERNAME; user = USERS.get(username)
+    data = get_anilist_data(USER_SNAPSHOT_QUERY, {'userName': username}, "UserSnapshot", cache_ttl=CACHE_CONFIG["ttl_snapshot"], cache=user.snapshot_cache, limiter=user.limiter)
+    if not data or not data.get('data'): return None
+    return data['data']
+
+LIST_PAGE_QUERY = """
+query ($userName: String, $type: MediaType, $page: Int, $perPage: Int) {
+  Page(page: $page, perPage: $perPage) { pageInfo { hasNextPage } mediaList(userName: $userName, type: $type, sort: [UPDATED_TIME_DESC]) { updatedAt progress status score(format: POINT_100) media { id title { romaji english } coverImage { large } bannerImage type format } } }
+}"""
+
+def _fetch_list_page(username, media_type, page, per_page):
+    data = get_anilist_data(LIST_PAGE_QUERY, {'userName': username, 'type': media_type, 'page': page, 'perPage': per_page}, "ListSync")
+    page_data = ((data or {}).get('data') or {}).get('Page')
+    if page_data is None: return None
+    return page_data.get('mediaList') or [], bool((page_data.get('pageInfo') or {}).get('hasNextPage'))
+
+def _run_mirror_sync(username):
+    try: return LIST_MIRROR.sync(username, _fetch_list_page)
+    except Exception as e: METRICS.error("mirror_sync"); app.logger.exception("List mirror sync failed for %s: %s", username, e)
+
+def sync_list_mirror(username=None):
+    username = username or ANILIST_USERNAME; key = username.lower()
+    with MIRROR_SYNC_LOCK:
+        job = MIRROR_SYNCS.get(key)
+        if (job is None or job.done()) and LIST_MIRROR.sync_due(username, CACHE_CONFIG["ttl_snapshot"]):
+            job = MIRROR_SYNCS[key] = MIRROR_EXECUTOR.submit(_run_mirror_sync, username)
+    return job
+
+def mirror_ready(username=None):
+    if not LIST_MIRROR: return False
+    username = username or ANILIST_USERNAME; sync_list_mirror(username)
+    return LIST_MIRROR.ready(username)
+
+def get_last_updated_media_for_activity(media_type="ANIME", username=None):
+    if mirror_ready(username): return LIST_MIRROR.last_updated(username or ANILIST_USERNAME, media_type)
+    snapshot = get_user_snapshot(username)
+    if not snapshot: return None
+    entries = (snapshot.get(media_type.lower()) or {}).get('mediaList') or []
+    return entries[0] if entries else None
+
+def card_asset_loaders(card, data, scale=1):
+    return {name: (lambda t, url=url, variant=variant, prepare=prepare: ASSET_CACHE.get_derivative(url, variant, prepare, t))
+            for name, (url, variant, prepare) in card_assets(CARD_SPECS[card], data, scale).items()}
+
+def mark_partial(image, complete):
+    if not complete: image.info["partial"] = True
+    return image
+
+def render_card_image(card, data, assets=None, scale=1):
+    complete = True
+    if assets is None:
+        loaders = card_asset_loaders(card, data, scale); assets, complete = fetch_card_assets(loaders) if loaders else ({}, True)
+    return mark_partial(render_card(CARD_SPECS[card], data, assets, scale), complete)
+
+def generate_activity_image(media_entry, media_type_for_log="MEDIA", assets=None, scale=1):
+    return render_card_image("activity", (media_entry, media_type_for_log), assets, scale)
+
+def get_completed_anime_count_for_goal(username=None):
+    if mirror_ready(username): return LIST_MIRROR.completed_count(username or ANILIST_USERNAME)
+    snapshot = get_user_snapshot(username)
+    if not snapshot: return -1
+    stats = ((snapshot.get('user') or {}).get('statistics') or {}).get('anime') or {}
     if stats and stats.get('statuses'):
         for s_entry in stats['statuses']:
             if s_entry.get('status') == 'COMPLETED': return s_entry.get('count', 0)
     return 0
-def draw_progress_bar_for_goal(draw_ctx,x,y,w,h,prog_pct,bg_c,fill_c,rad):
-    prog_pct=max(0,min(1,prog_pct)); draw_ctx.rounded_rectangle((x,y,x+w,y+h),radius=rad,fill=bg_c)
-    if prog_pct>0: fill_w=w*prog_pct; draw_ctx.rounded_rectangle((x,y,x+fill_w,y+h),radius=rad,fill=fill_c) if fill_w >= 2*rad else draw_ctx.rectangle((x,y, x+fill_w, y+h), fill=fill_c)
-def generate_goal_progress_image_combined():
-    cfg=STYLE_CONFIG; w,h=cfg["image_width_goal"],cfg["image_height_goal"]; FNT_T,FNT_D=FONT_TITLE_GOAL,FONT_DETAILS_GOAL
-    img=Image.new('RGB',(w,h),color=cfg["background_color_goal"]); draw=ImageDraw.Draw(img)
-    completed=get_completed_anime_count_for_goal(); goal_total=cfg["anime_goal_total"]
-    if completed==-1: err_txt="Error fetching data"; bb=draw.textbbox((0,0),err_txt,font=FNT_T); tw,th=bb[2]-bb[0],bb[3]-bb[1]; draw.text(((w-tw)/2,(h-th)/2),err_txt,font=FNT_T,fill=cfg["text_color_title_goal"]); return img
-    title_txt="Anime Completion Goal"; bbT=draw.textbbox((0,0),title_txt,font=FNT_T); tW=bbT[2]-bbT[0]; title_x,title_y=(w-tW)/2,cfg["padding_general"]
-    draw.text((title_x,title_y),title_txt,font=FNT_T,fill=cfg["text_color_title_goal"]); cur_y=title_y+(bbT[3]-bbT[1])+cfg["padding_general"]/2
-    bar_w=w-(2*cfg["padding_general"]); bar_x,bar_y=cfg["padding_general"],cur_y
-    prog_pct=completed/goal_total if goal_total>0 else (1 if completed>0 else 0)
-    draw_progress_bar_for_goal(draw,bar_x,bar_y,bar_w,cfg["progress_bar_height"],prog_pct,cfg["progress_bar_bg_color"],cfg["progress_bar_fill_color"],cfg["progress_bar_corner_radius"])
-    cur_y+=cfg["progress_bar_height"]+cfg["padding_general"]/2
-    prog_txt=f"{completed} / {goal_total} Completed";
-    if completed>=goal_total and goal_total>0: prog_txt=f"Goal Achieved! ({completed}/{goal_total})"
-    bbP=draw.textbbox((0,0),prog_txt,font=FNT_D); pW=bbP[2]-bbP[0]; prog_x,prog_y=(w-pW)/2,cur_y
-    if prog_y+(bbP[3]-bbP[1]) > h-cfg["padding_general"]: prog_y = h-cfg["padding_general"]-(bbP[3]-bbP[1])
-    draw.text((prog_x,prog_y),prog_txt,font=FNT_D,fill=cfg["text_color_details_goal"])
-    return img
-
-def get_recently_completed_anime_with_score():
-    log_prefix = "GetRecentCompleted"; query = """
-    query ($userName: String, $type: MediaType, $status: MediaListStatus, $sort: [MediaListSort]) {
-      MediaListCollection(userName: $userName, type: $type, status: $status, sort: $sort, perChunk: 5, chunk: 1, forceSingleCompletedList: true) {
-        lists { entries { score(format: POINT_100) updatedAt media { id title { romaji english } coverImage { large } type format } } } } }"""
-    variables = {'userName': ANILIST_USERNAME, 'type': 'ANIME', 'status': 'COMPLETED', 'sort': 'UPDATED_TIME_DESC'}
-    data = get_anilist_data(query, variables, log_prefix)
-    if not data: return None
-    all_entries = []; collection = data.get('data',{}).get('MediaListCollection',{})
-    if collection and collection.get('lists'):
-        for lst in collection['lists']:
-            if lst and lst.get('entries'): all_entries.extend(lst['entries'])
-    if not all_entries: return None
-    all_entries.sort(key=lambda x: x.get('updatedAt',0), reverse=True) 
-    if all_entries: return all_entries[0]
-    else: return None
-
-def generate_recently_completed_image(completed_entry):
-    cfg = STYLE_CONFIG; w,h = cfg["image_width_completed"], cfg["image_height_completed"]
-    FNT_T, FNT_SUB, FNT_SV, FNT_SS = FONT_TITLE_COMPLETED, FONT_SUBTITLE_COMPLETED, FONT_SCORE_VALUE_COMPLETED, FONT_SCORE_SUFFIX_COMPLETED
-    final_img = Image.new('RGBA', (w,h), cfg["background_completed_color"]+(255,))
-    draw = ImageDraw.Draw(final_img)
-    if not completed_entry or not completed_entry.get('media'):
-        err_txt = "No recently completed anime."; bb=draw.textbbox((0,0),err_txt,font=FNT_T); tw,th=bb[2]-bb[0],bb[3]-bb[1]; draw.text(((w-tw)/2,(h-th)/2),err_txt,font=FNT_T,fill=cfg["text_color_title_completed"]); return final_img.convert("RGB")
-    media = completed_entry['media']; title_full = media.get('title',{}).get('english') or media.get('title',{}).get('romaji') or "Untitled"
-    score_raw = completed_entry.get('score',0)
-    score_disp_val = f"{score_raw}" if score_raw > 0 else "N/S"
-    score_disp_suf = " /100" if score_raw > 0 else ""
-    padding = cfg["padding_completed"]
-    cx,cy = padding,(h-cfg["cover_completed_size"][1])//2
-    if media.get('coverImage',{}).get('large'):
-        try:
-            cover_resp=requests.get(media['coverImage']['large'],stream=True,timeout=cfg["request_timeout"]);cover_resp.raise_for_status()
-            cover_img_raw = Image.open(BytesIO(cover_resp.content)).convert("RGBA"); 
-            cover_img = cover_img_raw.resize(cfg["cover_completed_size"],Image.Resampling.LANCZOS); 
-            final_img.paste(add_rounded_corners(cover_img,cfg["cover_completed_corner_radius"]),(cx,cy),cover_img)
-        except Exception as e: draw.rectangle((cx,cy,cx+cfg["cover_completed_size"][0],cy+cfg["cover_completed_size"][1]),fill=(50,50,60,200))
-    else: draw.rectangle((cx,cy,cx+cfg["cover_completed_size"][0],cy+cfg["cover_completed_size"][1]),fill=(50,50,60,200))
-    sval_bb = draw.textbbox((0,0), score_disp_val, font=FNT_SV); sval_w,sval_h = sval_bb[2]-sval_bb[0],sval_bb[3]-sval_bb[1]
-    sval_ascent, _ = FNT_SV.getmetrics(); ssuf_w = 0
-    if score_raw > 0: ssuf_bb = draw.textbbox((0,0), score_disp_suf, font=FNT_SS); ssuf_w = ssuf_bb[2]-ssuf_bb[0]; ssuf_ascent, _ = FNT_SS.getmetrics()
-    score_total_w = sval_w + (ssuf_w + 3 if score_raw > 0 else 0); score_x_start = w - padding - score_total_w
-    score_block_center_y = h / 2
-    score_val_y = score_block_center_y - sval_ascent + (sval_ascent - sval_h) / 2 
-    draw.text((score_x_start, score_val_y), score_disp_val, font=FNT_SV, fill=cfg["text_color_score_value_completed"])
-    if score_raw > 0:
-        score_suf_y = score_block_center_y - ssuf_ascent + (ssuf_ascent-(draw.textbbox((0,0),score_disp_suf,font=FNT_SS)[3]-draw.textbbox((0,0),score_disp_suf,font=FNT_SS)[1]))/2
-        draw.text((score_x_start + sval_w + 3, score_suf_y), score_disp_suf, font=FNT_SS, fill=cfg["text_color_score_suffix_completed"])
-    text_area_x_start = cx + cfg["cover_completed_size"][0] + padding
-    text_area_max_width = score_x_start - text_area_x_start - padding
-    lines = []; words = title_full.split(); current_line = ""
-    for i, word in enumerate(words):
-        test_line = current_line + (" " if current_line else "") + word
-        line_bbox = draw.textbbox((0,0), test_line, font=FNT_T); line_width = line_bbox[2] - line_bbox[0]
-        if line_width <= text_area_max_width: current_line = test_line
-        else:
-            if current_line: lines.append(current_line)
-            current_line = word 
-            word_bbox = draw.textbbox((0,0), current_line, font=FNT_T)
-            if (word_bbox[2]-word_bbox[0]) > text_area_max_width and len(current_line.strip()) > 3:
-                while (draw.textbbox((0,0), current_line + "...", font=FNT_T)[2]) > text_area_max_width and len(current_line) > 3: current_line = current_line[:-1]
-                current_line = current_line + "..."; lines.append(current_line); current_line = "" ; break 
-    if current_line: lines.append(current_line)
-    if len(lines) > cfg["title_max_lines"]:
-        lines = lines[:cfg["title_max_lines"]]
-        if lines and len(lines[-1]) > 3 and not lines[-1].endswith("..."): lines[-1] = lines[-1][:-3] + "..."
-    title_block_height = sum([(draw.textbbox((0,0),l,font=FNT_T)[3]-draw.textbbox((0,0),l,font=FNT_T)[1]) + (cfg["line_spacing_details"]/3 if idx < len(lines)-1 else 0) for idx,l in enumerate(lines)])
-    subtitle_text = "Recently Completed"
-    subtitle_bbox = draw.textbbox((0,0), subtitle_text, font=FNT_SUB); subtitle_height = subtitle_bbox[3] - subtitle_bbox[1]
-    total_text_block_height = title_block_height + (cfg["line_spacing_title_details"] if lines else 0) + subtitle_height
-    block_y_start = (h - total_text_block_height) / 2; 
-    if block_y_start < padding: block_y_start = padding
-    current_y_text = block_y_start 
-    for line_idx, line_text in enumerate(lines):
-        line_bbox = draw.textbbox((0,0), line_text, font=FNT_T); line_height_actual = line_bbox[3] - line_bbox[1]
-        draw.text((text_area_x_start, current_y_text), line_text, font=FNT_T, fill=cfg["text_color_title_completed"])
-        current_y_text += line_height_actual + (cfg["line_spacing_details"]/3 if line_idx < len(lines) -1 else 0)
-    subtitle_y = current_y_text + (cfg["line_spacing_title_details"] if lines else 0)
-    if subtitle_y + subtitle_height > h - padding: subtitle_y = h - padding - subtitle_height
-    draw.text((text_area_x_start, subtitle_y), subtitle_text, font=FNT_SUB, fill=cfg["text_color_subtitle_completed"])
-    return final_img.convert("RGB")
-
-def _create_image_response(image_object):
-    img_io=BytesIO(); image_object.save(img_io,'PNG'); img_io.seek(0)
-    resp=make_response(send_file(img_io,mimetype='image/png'))
-    resp.headers['Cache-Control']='no-cache,no-store,must-revalidate,public,max-age=0'; resp.headers['Pragma']='no-cache'; resp.headers['Expires']='0'
+def generate_goal_progress_image_combined(completed=None, username=None, scale=1):
+    if completed is None: completed = get_completed_anime_count_for_goal(username)
+    return render_card_image("goal", completed, {}, scale)
+
+def get_recently_completed_entries(username=None, limit=None):
+    limit = limit or STYLE_CONFIG["grid_max_items"]
+    if mirror_ready(username): return LIST_MIRROR.completed_entries(username or ANILIST_USERNAME, limit)
+    snapshot = get_user_snapshot(username)
+    if not snapshot: return None
+    all_entries = list((snapshot.get('completed') or {}).get('mediaList') or [])
+    all_entries.sort(key=lambda x: x.get('updatedAt',0), reverse=True)
+    return all_entries[:limit]
+
+def get_recently_completed_anime_with_score(username=None):
+    entries = get_recently_completed_entries(username, 1)
+    return entries[0] if entries else None
+
+def generate_recently_completed_image(completed_entry, assets=None, scale=1):
+    return render_card_image("completed", completed_entry, assets, scale)
+
+def generate_completed_grid_image(entries, columns=None, assets=None, scale=1):
+    return render_card_image("grid", (entries, columns), assets, scale)
+
+COMPOSITE_PARTS = {
+    "last_anime": (lambda username: get_last_updated_media_for_activity("ANIME", username), "activity", lambda entry: (entry, "ANIME")),
+    "last_manga": (lambda username: get_last_updated_media_for_activity("MANGA", username), "activity", lambda entry: (entry, "MANGA")),
+    "anime_goal_progress": (get_completed_anime_count_for_goal, "goal", lambda completed: completed),
+    "recently_completed_anime": (get_recently_completed_anime_with_score, "completed", lambda entry: entry),
+    "completed_grid": (get_recently_completed_entries, "grid", lambda entries: (entries, None)),
+}
+COMPOSITE_DEFAULT_CARDS = ("last_anime", "anime_goal_progress", "recently_completed_anime")
+
+def generate_composite_image(parts, scale=1):
+    cfg = STYLE_CONFIG; cards = [(name, COMPOSITE_PARTS[name][1], COMPOSITE_PARTS[name][2](data)) for name, data in parts]
+    part_loaders = [card_asset_loaders(card, data, scale) for _, card, data in cards]
+    assets, complete = fetch_card_assets({f"{name}_{kind}": loader for (name, _, _), loaders in zip(cards, part_loaders) for kind, loader in loaders.items()})
+    images = [render_card(CARD_SPECS[card], data, {kind: assets[f"{name}_{kind}"] for kind in loaders}, scale) for (name, card, data), loaders in zip(cards, part_loaders)]
+    gap = cfg["composite_gap"] * scale; w = max(im.width for im in images); h = sum(im.height for im in images) + gap * (len(images) - 1)
+    final_img = Image.new('RGBA', (w, h), cfg["composite_background"]); y = 0
+    for im in images: final_img.paste(im, ((w - im.width) // 2, y)); y += im.height + gap
+    return mark_partial(final_img, complete)
+
+def card_fingerprint(card, *inputs, scale=1):
+    payload = json.dumps([card, inputs, STYLE_FINGERPRINT] + ([scale] if scale != 1 else []), sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+def _image_response(key, fmt, load):
+    partial = False
+    if request.if_none_match.contains(key):
+        resp=make_response('',304)
+    else:
+        body, partial = load(); resp=make_response(body); resp.mimetype=MIMETYPES[fmt]
+    resp.set_etag(f"{key}.partial" if partial else key, weak=partial); resp.vary.add('Accept')
+    resp.headers['Cache-Control']=CACHE_CONFIG["partial_cache_control" if partial else "card_cache_control"]
+    return resp
+
+def _create_image_response(fingerprint, render, username=None, encoding=("png", {})):
+    fmt, options = encoding; key=f"{fingerprint}.{fmt}"
+    return _image_response(key, fmt, lambda: _load_render(USERS.get(username or ANILIST_USERNAME).render_cache, key, render, fmt, options))
+
+def _load_render(render_cache, key, render, fmt, options):
+    body, state = render_cache.get(key)
+    if state == "fresh": render_cache.hits += 1; return body, False
+    render_cache.misses += 1
+    body, partial = RENDER_FLIGHT.do(key, lambda: _render_and_encode(render, fmt, options))
+    if not partial: render_cache.set(key, body)
+    return body, partial
+
+def _render_and_encode(render, fmt, options):
+    with METRICS.timer("render"): image = render()
+    with METRICS.timer("encode"): return encode_image(image, fmt, **options), bool(image.info.get("partial"))
+
+def _card_encoding(card, fmt): return fmt, {"palette": CARD_ENCODINGS[card]["palette"] and fmt == "png"}
+
+def _resolve_encoding(card, accept=None, requested=None):
+    if accept is None: accept, requested = request.accept_mimetypes, request.args.get("format")
+    fmt = negotiate_format(accept, CARD_ENCODINGS[card]["formats"] if FORMAT_NEGOTIATION else ("png",), requested)
+    if fmt is None: abort(400, description="Unsupported image format")
+    return _card_encoding(card, fmt)
+
+def _build_activity_card(media_type, username=None, scale=1):
+    latest=get_last_updated_media_for_activity(media_type,username)
+    return card_fingerprint("activity",media_type,latest,scale=scale), lambda: generate_activity_image(latest,media_type,scale=scale)
+
+def _build_goal_card(username=None, scale=1):
+    completed=get_completed_anime_count_for_goal(username)
+    return card_fingerprint("goal",completed,scale=scale), lambda: generate_goal_progress_image_combined(completed,username,scale)
+
+def _build_completed_card(username=None, scale=1):
+    entry=get_recently_completed_anime_with_score(username)
+    return card_fingerprint("completed",entry,scale=scale), lambda: generate_recently_completed_image(entry,scale=scale)
+
+def _build_composite_card(names, username=None, scale=1):
+    parts=[(name, COMPOSITE_PARTS[name][0](username)) for name in names]
+    return card_fingerprint("composite",parts,scale=scale), lambda: generate_composite_image(parts,scale)
+
+def _build_grid_card(count, columns, username=None, scale=1):
+    entries=get_recently_completed_entries(username,count)
+    return card_fingerprint("grid",columns,entries,scale=scale), lambda: generate_completed_grid_image(entries,columns,scale=scale)
+
+def _composite_cards(spec=None):
+    names = list(dict.fromkeys(filter(None, (part.strip() for part in (spec or "").split(","))))) or list(COMPOSITE_DEFAULT_CARDS)
+    if any(name not in COMPOSITE_PARTS for name in names): abort(400, description="Unknown card in composite")
+    return names
+
+def _grid_args(count=None, columns=None):
+    cfg = STYLE_CONFIG
+    try: count = min(max(int(count or cfg["grid_max_items"]), 1), cfg["grid_max_items"]); columns = min(max(int(columns or CARD_SPECS["grid"]["columns"]), 1), count)
+    except ValueError: abort(400, description="Invalid grid size")
+    return count, columns
+
+def _resolve_scale(requested=None):
+    try: return min(max(int(requested or 1), 1), STYLE_CONFIG["max_scale"])
+    except ValueError: abort(400, description="Invalid scale")
+
+CARD_BUILDERS = {
+    "last_anime": ("activity", lambda username=None, scale=1: _build_activity_card("ANIME", username, scale)),
+    "last_manga": ("activity", lambda username=None, scale=1: _build_activity_card("MANGA", username, scale)),
+    "anime_goal_progress": ("goal", _build_goal_card),
+    "recently_completed_anime": ("completed", _build_completed_card),
+}
+
+def _prerender_jobs(spec):
+    jobs = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, interval = item.partition(":")
+        card, build = CARD_BUILDERS[name]
+        jobs[name] = (float(interval or 300), lambda build=build: build(ANILIST_USERNAME), [_card_encoding(card, fmt) for fmt in CARD_ENCODINGS[card]["formats"]])
+    return jobs
+
+PRERENDER = PrerenderScheduler(_prerender_jobs(PRERENDER_CONFIG["cards"]), encode_image, PRERENDER_CONFIG["jitter"]) if PRERENDER_CONFIG["enabled"] and ANILIST_USERNAME else None
+if PRERENDER: PRERENDER.start()
+
+def _serve_card(name, username, encoding, scale=1):
+    ready = PRERENDER.get(name, encoding[0]) if PRERENDER and username == ANILIST_USERNAME and scale == 1 else None
+    if ready: return _image_response(ready[0], encoding[0], lambda: (ready[1], False))
+    fingerprint, render = CARD_BUILDERS[name][1](username, scale)
+    return _create_image_response(fingerprint, render, username, encoding)
+
+def _resolve_username(username):
+    if username is None: return ANILIST_USERNAME
+    if not USERNAME_PATTERN.match(username) or (ANILIST_ALLOWED_USERS and username.lower() not in ANILIST_ALLOWED_USERS): abort(404)
+    return username
+
+def _card_error(e, description=None):
+    METRICS.error("route"); app.logger.exception("Card route failed: %s", e)
+    abort(500, description=description)
+
+@app.before_request
+def _start_timing():
+    g.timing_token = METRICS.start_request(); g.started = time.perf_counter()
+    g.deadline_token = deadline.start(STYLE_CONFIG["request_deadline"])
+
+@app.after_request
+def _add_server_timing(resp):
+    if "deadline_token" in g: deadline.reset(g.pop("deadline_token"))
+    token = g.pop("timing_token", None)
+    if token is not None:
+        totals = METRICS.finish_request(token); total_ms = (time.perf_counter() - g.started) * 1000
+        METRICS.observe("total", total_ms); totals["total"] = total_ms
+        resp.headers['Server-Timing'] = server_timing(totals)
+    return resp
+
+def _cache_gauges(name, caches):
+    counts = {field: sum(getattr(cache, field) for cache in caches) for field in ("hits", "stale_hits", "misses", "fallbacks")}
+    lookups = counts["hits"] + counts["stale_hits"] + counts["misses"]
+    return [("card_cache_requests_total", {"cache": name, "result": field}, value) for field, value in counts.items()] + \
+           [("card_cache_hit_ratio", {"cache": name}, round((counts["hits"] + counts["stale_hits"]) / lookups, 4) if lookups else 0)]
+
+def _metric_gauges():
+    users = USERS.states(); limiter = ANILIST_RATE_LIMITER; bbox = text_bbox.cache_info()
+    gauges = _cache_gauges("user_snapshot", [u.snapshot_cache for u in users]) + _cache_gauges("user_render", [u.render_cache for u in users])
+    gauges += [("card_cache_requests_total", {"cache": "assets", "result": "hits"}, ASSET_CACHE.hits), ("card_cache_requests_total", {"cache": "assets", "result": "misses"}, ASSET_CACHE.misses),
+               ("card_cache_requests_total", {"cache": "assets", "result": "negative_hits"}, ASSET_CACHE.negative_hits),
+               ("card_cache_requests_total", {"cache": "text_bbox", "result": "hits"}, bbox.hits), ("card_cache_requests_total", {"cache": "text_bbox", "result": "misses"}, bbox.misses)]
+    gauges += [("anilist_ratelimit_remaining", {}, -1 if limiter.remaining is None else limiter.remaining), ("anilist_ratelimit_tokens", {}, round(limiter.tokens, 2)),
+               ("anilist_ratelimit_blocked_seconds", {}, round(max(0.0, limiter.blocked_until - time.monotonic()), 2)),
+               ("anilist_ratelimit_throttled_total", {}, limiter.throttled), ("anilist_ratelimit_shed_total", {}, limiter.shed),
+               ("anilist_circuit_open", {}, int(ANILIST_BREAKER.state != "closed")), ("anilist_circuit_opened_total", {}, ANILIST_BREAKER.opened), ("anilist_circuit_rejected_total", {}, ANILIST_BREAKER.rejected)]
+    gauges += [("card_singleflight", {"flight": name, "stat": field}, value) for name, flight in (("anilist", ANILIST_FLIGHT), ("render", RENDER_FLIGHT)) for field, value in flight.stats().items()]
+    gauges += [("card_users_cached", {}, len(users)), ("card_user_memory_bytes", {}, sum(u.memory_bytes for u in users)), ("card_user_evictions_total", {}, USERS.evictions)]
+    if PRERENDER: gauges += [("card_prerender_total", {"result": field}, getattr(PRERENDER, field)) for field in ("renders", "unchanged", "failures", "served")]
+    return gauges
+
+@app.route('/metrics')
+def metrics_route():
+    resp = make_response(METRICS.render(_metric_gauges())); resp.mimetype = 'text/plain'; resp.headers['Cache-Control'] = 'no-store'
     return resp
 
 @app.route('/')
 def root_message():
-    return "Anilist Image Generator. Endpoints: /last_anime.png, /last_manga.png, /anime_goal_progress.png, /recently_completed_anime.png"
+    return "Anilist Image Generator. Endpoints: /last_anime.png, /last_manga.png, /anime_goal_progress.png, /recently_completed_anime.png, /composite.png?cards=..., /completed_grid.png?n=&columns= (prefix with /u/<username> for other users, add ?scale=2 or 3 for HiDPI)"
 
 @app.route('/last_anime.png')
-def last_anime_image_route():
-    try: latest=get_last_updated_media_for_activity("ANIME"); img=generate_activity_image(latest,"ANIME"); return _create_image_response(img)
-    except Exception as e: abort(500)
+@app.route('/u/<username>/last_anime.png')
+def last_anime_image_route(username=None):
+    user=_resolve_username(username); encoding=_resolve_encoding("activity"); scale=_resolve_scale(request.args.get("scale"))
+    try: return _serve_card("last_anime", user, encoding, scale)
+    except Exception as e: _card_error(e)
 
 @app.route('/last_manga.png')
-def last_manga_image_route():
-    try: latest=get_last_updated_media_for_activity("MANGA"); img=generate_activity_image(latest,"MANGA"); return _create_image_response(img)
-    except Exception as e: abort(500)
+@app.route('/u/<username>/last_manga.png')
+def last_manga_image_route(username=None):
+    user=_resolve_username(username); encoding=_resolve_encoding("activity"); scale=_resolve_scale(request.args.get("scale"))
+    try: return _serve_card("last_manga", user, encoding, scale)
+    except Exception as e: _card_error(e)
 
 @app.route('/anime_goal_progress.png')
-def anime_goal_progress_image_route():
-    try: img=generate_goal_progress_image_combined(); return _create_image_response(img)
-    except Exception as e: abort(500)
+@app.route('/u/<username>/anime_goal_progress.png')
+def anime_goal_progress_image_route(username=None):
+    user=_resolve_username(username); encoding=_resolve_encoding("goal"); scale=_resolve_scale(request.args.get("scale"))
+    try: return _serve_card("anime_goal_progress", user, encoding, scale)
+    except Exception as e: _card_error(e)
 
 @app.route('/recently_completed_anime.png')
-def recently_completed_anime_route():
+@app.route('/u/<username>/recently_completed_anime.png')
+def recently_completed_anime_route(username=None):
+    user = _resolve_username(username); encoding = _resolve_encoding("completed"); scale = _resolve_scale(request.args.get("scale"))
     try:
-        entry = get_recently_completed_anime_with_score()
-        img = generate_recently_completed_image(entry)
-        return _create_image_response(img)
+        return _serve_card("recently_completed_anime", user, encoding, scale)
     except Exception as e:
-        abort(500, description="Error generating recently completed anime image")
+        _card_error(e, "Error generating recently completed anime image")
+
+@app.route('/composite.png')
+@app.route('/u/<username>/composite.png')
+def composite_image_route(username=None):
+    user=_resolve_username(username); encoding=_resolve_encoding("composite"); scale=_resolve_scale(request.args.get("scale")); names=_composite_cards(request.args.get("cards"))
+    try: return _create_image_response(*_build_composite_card(names, user, scale), user, encoding)
+    except Exception as e: _card_error(e)
+
+@app.route('/completed_grid.png')
+@app.route('/u/<username>/completed_grid.png')
+def completed_grid_image_route(username=None):
+    user=_resolve_username(username); encoding=_resolve_encoding("grid"); scale=_resolve_scale(request.args.get("scale")); count, columns=_grid_args(request.args.get("n"), request.args.get("columns"))
+    try: return _create_image_response(*_build_grid_card(count, columns, user, scale), user, encoding)
+    except Exception as e: _card_error(e)
 
 if __name__ == '__main__':
     if not ANILIST_USERNAME: pass
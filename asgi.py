@@ -0,0 +1,222 @@
+import asyncio
+import contextvars
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+import httpx
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import parse_accept_header, parse_etags
+
+import app as cards
+import deadline
+from encoding import MIMETYPES
+from metrics import METRICS, server_timing
+from rate_limit import backoff_delay
+
+ASYNC_CONFIG = {
+    "render_workers": int(os.getenv("ASYNC_RENDER_WORKERS", os.cpu_count() or 4)),
+    "max_connections": int(os.getenv("ASYNC_HTTP_MAX_CONNECTIONS", 32)),
+}
+RENDER_EXECUTOR = ThreadPoolExecutor(max_workers=ASYNC_CONFIG["render_workers"], thread_name_prefix="card-render")
+CARD_ROUTES = {f"{name}.png": name for name in cards.CARD_BUILDERS}
+logger = logging.getLogger(__name__)
+
+
+class AsyncSingleFlight:
+    def __init__(self):
+        self.executed = self.coalesced = 0
+        self._tasks = {}
+
+    async def do(self, key, fn):
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+            self.executed += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+
+ANILIST_FLIGHT = AsyncSingleFlight()
+ASSET_FLIGHT = AsyncSingleFlight()
+UPSTREAM_SLOTS = asyncio.Semaphore(ASYNC_CONFIG["max_connections"])
+_client = None
+_refreshes = set()
+
+
+def http_client():
+    global _client
+    if _client is None:
+        limits = httpx.Limits(max_connections=ASYNC_CONFIG["max_connections"], max_keepalive_connections=ASYNC_CONFIG["max_connections"])
+        _client = httpx.AsyncClient(limits=limits, timeout=cards.STYLE_CONFIG["request_timeout"])
+    return _client
+
+
+async def run_sync(fn):
+    ctx = contextvars.copy_context(); ctx.run(cards.UPSTREAM_FETCH_ENABLED.set, False)
+    return await asyncio.get_running_loop().run_in_executor(RENDER_EXECUTOR, ctx.run, fn)
+
+
+async def fetch_anilist_data(query, variables, limiter=None):
+    client_cfg = cards.ANILIST_CLIENT_CONFIG; loop = asyncio.get_running_loop()
+    for attempt in range(client_cfg["max_retries"] + 1):
+        if not cards.ANILIST_BREAKER.allow(): METRICS.error("anilist_circuit"); return None
+        timeout = deadline.budget(cards.STYLE_CONFIG["request_timeout"], cards.STYLE_CONFIG["anilist_deadline_share"])
+        if timeout <= 0: METRICS.error("deadline"); return None
+        if limiter is not None and not limiter.acquire(): METRICS.error("user_rate_limit"); return None
+        with METRICS.timer("anilist_queue"): admitted = await loop.run_in_executor(None, cards.ANILIST_RATE_LIMITER.acquire, min(client_cfg["max_queue_wait"], timeout))
+        if not admitted: METRICS.error("anilist_queue"); return None
+        start = time.perf_counter()
+        try:
+            async with UPSTREAM_SLOTS: response = await http_client().post(cards.ANILIST_API_URL, json={'query': query, 'variables': variables}, headers=cards.anilist_headers(),
+                                                                           timeout=max(0.1, timeout - (time.perf_counter() - start)))
+        except httpx.HTTPError: response = None
+        METRICS.observe("anilist", (time.perf_counter() - start) * 1000)
+        if response is None or response.status_code >= 400: METRICS.error("anilist")
+        if response is None or response.status_code >= 500: cards.ANILIST_BREAKER.record_failure()
+        else: cards.ANILIST_BREAKER.record_success()
+        retry_after = cards.ANILIST_RATE_LIMITER.update_from_headers(response.status_code, response.headers) if response is not None else None
+        if response is None or response.status_code == 429 or response.status_code >= 500:
+            delay = retry_after + backoff_delay(0) if retry_after is not None else backoff_delay(attempt)
+            left = deadline.remaining()
+            if attempt == client_cfg["max_retries"] or delay > client_cfg["max_retry_delay"] or (left is not None and delay >= left): return None
+            await asyncio.sleep(delay); continue
+        try: response.raise_for_status(); return response.json()
+        except Exception: METRICS.error("anilist_decode"); return None
+    return None
+
+
+async def _load_snapshot(user, key, variables):
+    data = await ANILIST_FLIGHT.do(key, lambda: fetch_anilist_data(cards.USER_SNAPSHOT_QUERY, variables, user.limiter))
+    if data is not None and data.get('data'): user.snapshot_cache.set(key, data, cards.CACHE_CONFIG["ttl_snapshot"])
+
+
+async def prefetch_snapshot(username):
+    user = cards.USERS.get(username); variables = {'userName': username}
+    key = cards.anilist_cache_key(cards.USER_SNAPSHOT_QUERY, variables)
+    state = user.snapshot_cache.get(key)[1]
+    if state == "fresh": return
+    if state != "stale": return await _load_snapshot(user, key, variables)
+    task = asyncio.ensure_future(_load_snapshot(user, key, variables)); _refreshes.add(task); task.add_done_callback(_refreshes.discard)
+
+
+async def _download(url, timeout):
+    try:
+        with METRICS.timer("download"):
+            async with UPSTREAM_SLOTS: response = await http_client().get(url, timeout=timeout)
+            response.raise_for_status()
+        cards.ASSET_CACHE.write_raw(url, response.content)
+    except httpx.HTTPError:
+        cards.ASSET_CACHE.record_failure(url)
+
+
+async def prefetch_assets(urls):
+    pending = [url for url in urls if url and not cards.ASSET_CACHE.has_raw(url) and not cards.ASSET_CACHE.failed_recently(url)]
+    if not pending: return
+    timeout = deadline.budget(cards.STYLE_CONFIG["asset_deadline"]); start = time.perf_counter()
+    try: await asyncio.wait_for(asyncio.gather(*(ASSET_FLIGHT.do(url, lambda url=url: _download(url, timeout)) for url in pending)), timeout)
+    except asyncio.TimeoutError: METRICS.error("asset_deadline")
+    METRICS.observe("asset_prefetch", (time.perf_counter() - start) * 1000)
+
+
+def _media_urls(data):
+    entries = data if isinstance(data, list) else [data] if isinstance(data, dict) else []
+    media = [(entry or {}).get('media') or {} for entry in entries]
+    return [url for m in media for url in ((m.get('coverImage') or {}).get('large'), m.get('bannerImage')) if url]
+
+
+def _part_urls(names, username):
+    return [url for name in names for url in _media_urls(cards.COMPOSITE_PARTS[name][0](username))]
+
+
+def _route(route, query):
+    if route not in CARD_ROUTES and route not in ("composite.png", "completed_grid.png"): return None
+    scale = cards._resolve_scale(query.get("scale"))
+    if route in CARD_ROUTES:
+        name = CARD_ROUTES[route]; card, build = cards.CARD_BUILDERS[name]
+        return name if scale == 1 else None, card, lambda username: build(username, scale), lambda username: _part_urls([name], username)
+    if route == "composite.png":
+        names = cards._composite_cards(query.get("cards"))
+        return None, "composite", lambda username: cards._build_composite_card(names, username, scale), lambda username: _part_urls(names, username)
+    if route == "completed_grid.png":
+        count, columns = cards._grid_args(query.get("n"), query.get("columns"))
+        return (None, "grid", lambda username: cards._build_grid_card(count, columns, username, scale),
+                lambda username: _media_urls(cards.get_recently_completed_entries(username, count)))
+
+
+async def serve_card(name, card, build, asset_urls, username, headers, query):
+    user = cards._resolve_username(username)
+    encoding = cards._resolve_encoding(card, MIMEAccept(parse_accept_header(headers.get("accept", ""))), query.get("format"))
+    fmt, options = encoding; etags = parse_etags(headers.get("if-none-match"))
+    ready = cards.PRERENDER.get(name, fmt) if cards.PRERENDER and name and user == cards.ANILIST_USERNAME else None
+    partial = False
+    if ready: key, body = ready
+    else:
+        if cards.LIST_MIRROR is None or not cards.LIST_MIRROR.ready(user): await prefetch_snapshot(user)
+        fingerprint, render = await run_sync(lambda: build(user))
+        key = f"{fingerprint}.{fmt}"; render_cache = cards.USERS.get(user).render_cache; body = None
+        if not etags.contains(key):
+            cached, state = render_cache.get(key)
+            body = cached if state == "fresh" else None
+        if body is None and not etags.contains(key):
+            await prefetch_assets(await run_sync(lambda: asset_urls(user)))
+            body, partial = await run_sync(lambda: cards._load_render(render_cache, key, render, fmt, options))
+    if partial: return 200, [("etag", f'W/"{key}.partial"'), ("cache-control", cards.CACHE_CONFIG["partial_cache_control"]), ("vary", "Accept"), ("content-type", MIMETYPES[fmt])], body
+    response_headers = [("etag", f'"{key}"'), ("cache-control", cards.CACHE_CONFIG["card_cache_control"]), ("vary", "Accept")]
+    if etags.contains(key): return 304, response_headers, b""
+    return 200, response_headers + [("content-type", MIMETYPES[fmt])], body
+
+
+async def handle(scope):
+    path, method = scope["path"], scope["method"]
+    headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+    query = {k: v[0] for k, v in parse_qs(scope.get("query_string", b"").decode("latin-1")).items()}
+    if method not in ("GET", "HEAD"): return 405, [("content-type", "text/plain")], b"Method Not Allowed"
+    if path == "/": return 200, [("content-type", "text/plain; charset=utf-8")], cards.root_message().encode()
+    if path == "/metrics": return 200, [("content-type", "text/plain"), ("cache-control", "no-store")], METRICS.render(cards._metric_gauges()).encode()
+    parts = path.strip("/").split("/")
+    username, route = (parts[1], parts[2]) if len(parts) == 3 and parts[0] == "u" else (None, parts[-1] if len(parts) == 1 else None)
+    try:
+        target = _route(route, query)
+        if target is None: return 404, [("content-type", "text/plain")], b"Not Found"
+        return await serve_card(*target, username, headers, query)
+    except HTTPException as e:
+        return e.code, [("content-type", "text/plain")], (e.description or e.name).encode()
+    except Exception as e:
+        METRICS.error("route"); logger.exception("Card route failed: %s", e)
+        return 500, [("content-type", "text/plain")], b"Internal Server Error"
+
+
+async def lifespan(receive, send):
+    global _client
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            http_client(); await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            if _client is not None: await _client.aclose(); _client = None
+            await send({"type": "lifespan.shutdown.complete"}); return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan": return await lifespan(receive, send)
+    if scope["type"] != "http": return
+    timing_token = METRICS.start_request(); deadline_token = deadline.start(cards.STYLE_CONFIG["request_deadline"]); started = time.perf_counter()
+    try:
+        status, headers, body = await handle(scope)
+    finally:
+        deadline.reset(deadline_token); totals = METRICS.finish_request(timing_token)
+    total_ms = (time.perf_counter() - started) * 1000; METRICS.observe("total", total_ms); totals["total"] = total_ms
+    headers = headers + [("server-timing", server_timing(totals)), ("content-length", str(len(body)))]
+    await send({"type": "http.response.start", "status": status, "headers": [(k.encode(), v.encode("latin-1")) for k, v in headers]})
+    await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
+
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(application, host=os.getenv("HOST", "127.0.0.1"), port=int(os.getenv("PORT", 5000)), log_level="warning")
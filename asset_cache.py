@@ -0,0 +1,181 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from io import BytesIO
+
+from PIL import Image
+
+from http_client import UPSTREAM_FETCH_ENABLED, http_get
+from metrics import METRICS
+
+ASSET_CACHE_DIR = os.getenv("ASSET_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "lastanimanga_assets")
+ASSET_CACHE_MAX_BYTES = int(os.getenv("ASSET_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+ASSET_MEMORY_MAX_BYTES = int(os.getenv("ASSET_MEMORY_MAX_BYTES", 16 * 1024 * 1024))
+ASSET_NEGATIVE_TTL = float(os.getenv("ASSET_NEGATIVE_TTL", 300))
+ASSET_NEGATIVE_MAX_ENTRIES = 1024
+
+
+class AssetUnavailable(Exception):
+    pass
+
+
+class AssetCache:
+    def __init__(self, directory=ASSET_CACHE_DIR, max_bytes=ASSET_CACHE_MAX_BYTES, negative_ttl=ASSET_NEGATIVE_TTL, memory_max_bytes=ASSET_MEMORY_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_max_bytes = memory_max_bytes
+        self.negative_ttl = negative_ttl
+        self.hits = self.misses = self.negative_hits = 0
+        self._failed = {}
+        self._total_bytes = None
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        try:
+            os.makedirs(directory, exist_ok=True)
+            self.enabled = os.access(directory, os.W_OK)
+        except OSError:
+            self.enabled = False
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key.encode("utf-8")).hexdigest())
+
+    def read(self, key):
+        if not self.enabled:
+            with self._lock:
+                data = self._memory.get(key)
+                if data is not None:
+                    self._memory.move_to_end(key)
+                return data
+        path = self._path(key)
+        try:
+            with open(path, "rb") as fh:
+                data = fh.read()
+            os.utime(path)
+            return data
+        except OSError:
+            return None
+
+    def write(self, key, data):
+        if not self.enabled:
+            self._write_memory(key, data)
+            return
+        path = self._path(key)
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            return
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_size()
+            else:
+                self._total_bytes += len(data)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _write_memory(self, key, data):
+        if len(data) > self.memory_max_bytes:
+            return
+        with self._lock:
+            previous = self._memory.pop(key, None)
+            if previous is not None:
+                self._memory_bytes -= len(previous)
+            self._memory[key] = data
+            self._memory_bytes += len(data)
+            while self._memory_bytes > self.memory_max_bytes:
+                self._memory_bytes -= len(self._memory.popitem(last=False)[1])
+
+    def _scan_size(self):
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.is_file():
+                total += entry.stat().st_size
+        return total
+
+    def _evict(self):
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file():
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.max_bytes * 0.8:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._total_bytes = total
+
+    def has_raw(self, url):
+        if not self.enabled:
+            return f"raw|{url}" in self._memory
+        return os.path.exists(self._path(f"raw|{url}"))
+
+    def read_raw(self, url):
+        return self.read(f"raw|{url}")
+
+    def write_raw(self, url, data):
+        self.write(f"raw|{url}", data)
+
+    def failed_recently(self, url):
+        failed_until = self._failed.get(url)
+        if failed_until is None:
+            return False
+        if time.monotonic() < failed_until:
+            self.negative_hits += 1
+            return True
+        self._failed.pop(url, None)
+        return False
+
+    def fetch_bytes(self, url, timeout):
+        data = self.read_raw(url)
+        if data is not None:
+            return data
+        if self.failed_recently(url) or not UPSTREAM_FETCH_ENABLED.get():
+            raise AssetUnavailable(url)
+        try:
+            with METRICS.timer("download"):
+                response = http_get(url, timeout=timeout)
+                response.raise_for_status()
+                data = response.content
+        except Exception:
+            self.record_failure(url)
+            raise
+        self.write_raw(url, data)
+        return data
+
+    def record_failure(self, url):
+        if self.negative_ttl <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if len(self._failed) >= ASSET_NEGATIVE_MAX_ENTRIES:
+                self._failed = {key: until for key, until in self._failed.items() if until > now}
+                while len(self._failed) >= ASSET_NEGATIVE_MAX_ENTRIES:
+                    self._failed.pop(next(iter(self._failed)))
+            self._failed[url] = now + self.negative_ttl
+
+    def get_derivative(self, url, variant, builder, timeout):
+        key = f"derived|{variant}|{url}"
+        data = self.read(key)
+        if data is not None:
+            self.hits += 1
+            image = Image.open(BytesIO(data))
+            image.load()
+            return image
+        self.misses += 1
+        image = builder(Image.open(BytesIO(self.fetch_bytes(url, timeout))))
+        out = BytesIO()
+        image.save(out, "PNG", compress_level=1)
+        self.write(key, out.getvalue())
+        return image
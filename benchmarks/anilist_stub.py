@@ -0,0 +1,249 @@
+import json
+import re
+import socket
+import struct
+import threading
+import time
+import zlib
+from functools import lru_cache
+from io import BytesIO
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+LIST_NAMES = ["Watching", "Completed", "Paused", "Dropped", "Planning"]
+COVER_SIZE = (460, 650)
+BANNER_SIZE = (1900, 400)
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+@lru_cache(maxsize=1024)
+def fixture_image(path):
+    from PIL import Image, ImageDraw
+    size = BANNER_SIZE if "/banner/" in path else COVER_SIZE
+    seed = zlib.crc32(path.encode())
+    image = Image.linear_gradient("L").resize(size).convert("RGB")
+    image = Image.merge("RGB", [band.point(lambda v, k=k: (v + seed >> (8 * k)) % 256) for k, band in enumerate(image.split())])
+    draw = ImageDraw.Draw(image)
+    for i in range(40):
+        x, y = (seed * (i + 3)) % size[0], (seed * (i + 7)) % size[1]
+        draw.ellipse((x, y, x + size[0] // 6, y + size[0] // 6), fill=((seed >> i) % 256, (i * 53) % 256, (seed * i) % 256))
+    out = BytesIO()
+    image.save(out, "JPEG", quality=90)
+    return out.getvalue()
+
+
+def make_entries(count, media_type="ANIME", image_base="https://s4.anilist.co/file/anilistcdn/media"):
+    entries = []
+    for i in range(count):
+        media_id = (100000 if media_type == "ANIME" else 200000) + i
+        entries.append({
+            "updatedAt": 1700000000 + (i * 7919) % (count * 13 + 1),
+            "progress": i % 24 + 1,
+            "score": (i * 37) % 101,
+            "status": "COMPLETED" if i % 3 == 0 else "CURRENT",
+            "media": {
+                "id": media_id,
+                "title": {"romaji": f"Fixture Title Number {i} no Monogatari", "english": f"Fixture Title {i}" if i % 2 else None},
+                "coverImage": {"large": f"{image_base}/{media_type.lower()}/cover/large/bx{media_id}.jpg"},
+                "bannerImage": f"{image_base}/{media_type.lower()}/banner/{media_id}.jpg",
+                "type": media_type,
+                "format": "TV" if media_type == "ANIME" else "MANGA",
+            },
+        })
+    return entries
+
+
+class AniListStub:
+    def __init__(self, list_size=10, host="127.0.0.1", port=0, rate_limit=None, rate_window=60, image_base=None, per_user=False):
+        self.rate_limit = rate_limit
+        self.per_user = per_user
+        self.rate_window = rate_window
+        self.force_status = None
+        self.retry_after = 60
+        self.throttled = 0
+        self.graphql_fault = self.image_fault = None
+        self.fault_delay = 5.0
+        self.graphql_attempts = self.image_attempts = self.faults_injected = 0
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self.requests_served = 0
+        self.images_served = 0
+        self.connections_opened = 0
+        self.bytes_sent = 0
+        self.last_payload_bytes = 0
+        self._lock = threading.Lock()
+        self._server = StubServer((host, port), self._handler_class())
+        self._thread = None
+        self.entries = {t: make_entries(list_size, t, image_base=image_base or f"{self.url}/media") for t in ("ANIME", "MANGA")}
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def record(self, size):
+        with self._lock:
+            self.requests_served += 1
+            self.bytes_sent += size
+            self.last_payload_bytes = size
+
+    def admit(self):
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= self.rate_window:
+                self._window_start, self._window_count = now, 0
+            if self.force_status == 429 or (self.rate_limit is not None and self._window_count >= self.rate_limit):
+                self.throttled += 1
+                retry_after = self.retry_after if self.force_status == 429 else int(self.rate_window - (now - self._window_start)) + 1
+                return 429, {"Retry-After": str(retry_after), "X-RateLimit-Remaining": "0"}
+            self._window_count += 1
+            if self.force_status:
+                return self.force_status, {}
+            remaining = self.rate_limit - self._window_count if self.rate_limit is not None else 90
+            return 200, {"X-RateLimit-Limit": str(self.rate_limit or 90), "X-RateLimit-Remaining": str(remaining)}
+
+    def answer(self, query, variables):
+        aliases = re.findall(r"(\w+):\s*(Page\([^)]*\)\s*\{\s*mediaList\([^)]*\)|User\()", query)
+        if aliases:
+            return {"data": {alias: self._resolve(field, variables) for alias, field in aliases}}
+        return {"data": {self._root_name(query): self._resolve(query, variables)}}
+
+    def _root_name(self, query):
+        for name in ("Page", "MediaListCollection", "User"):
+            if name in query:
+                return name
+        return "unknown"
+
+    def _resolve(self, field, variables):
+        media_type = (re.search(r"type:\s*(ANIME|MANGA)\b", field) or [None, variables.get("type") or "ANIME"])[1]
+        status = (re.search(r"status:\s*(COMPLETED|CURRENT)\b", field) or [None, variables.get("status")])[1]
+        entries = sorted(self.entries.get(media_type, []), key=lambda e: e["updatedAt"], reverse=True)
+        if self.per_user and entries and variables.get("userName"):
+            shift = zlib.crc32(variables["userName"].lower().encode()) % len(entries)
+            entries = entries[shift:] + entries[:shift]
+        if status:
+            entries = [e for e in entries if e["status"] == status]
+        if "Page" in field:
+            page, per_page = self._int_arg(field, "page", variables, 1), self._int_arg(field, "perPage", variables, 50)
+            chunk = entries[(page - 1) * per_page:page * per_page]
+            return {"pageInfo": {"hasNextPage": page * per_page < len(entries)}, "mediaList": chunk}
+        if "MediaListCollection" in field:
+            per_chunk = re.search(r"perChunk:\s*(\d+)", field)
+            if per_chunk:
+                entries = entries[:int(per_chunk[1])]
+            return {"lists": [{"name": name, "entries": entries[i::len(LIST_NAMES)]} for i, name in enumerate(LIST_NAMES)]}
+        if "User" in field:
+            completed = sum(1 for e in self.entries["ANIME"] if e["status"] == "COMPLETED")
+            return {"statistics": {"anime": {"statuses": [{"status": "COMPLETED", "count": completed}]}}}
+        return None
+
+    def _int_arg(self, field, name, variables, default):
+        args = re.search(r"Page\(([^)]*)\)", field)
+        match = args and re.search(rf"\b{name}:\s*(\$?\w+)", args[1])
+        if not match:
+            return default
+        value = match[1]
+        return int(variables.get(value[1:], default) if value.startswith("$") else value)
+
+    def touch(self, media_type="ANIME", count=1):
+        with self._lock:
+            newest = max(e["updatedAt"] for t in self.entries for e in self.entries[t])
+            for i, entry in enumerate(self.entries[media_type][:count]):
+                entry["updatedAt"] = newest + i + 1
+                entry["progress"] += 1
+
+    def fault(self, kind):
+        with self._lock:
+            if kind == "graphql":
+                self.graphql_attempts += 1
+            else:
+                self.image_attempts += 1
+            fault = self.graphql_fault if kind == "graphql" else self.image_fault
+            if fault is not None:
+                self.faults_injected += 1
+            return fault
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                with stub._lock:
+                    stub.connections_opened += 1
+
+            def inject(self, kind):
+                fault = stub.fault(kind)
+                if fault == "slow":
+                    time.sleep(stub.fault_delay)
+                elif fault == "reset":
+                    self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+                    self.close_connection = True
+                    self.connection.close()
+                    return True
+                elif isinstance(fault, int):
+                    payload = json.dumps({"errors": [{"message": "Injected fault", "status": fault}]}).encode()
+                    self.send_response(fault)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                    return True
+                return False
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if self.inject("graphql"):
+                    return
+                status, headers = stub.admit()
+                if status == 200:
+                    payload = json.dumps(stub.answer(body.get("query", ""), body.get("variables") or {})).encode()
+                else:
+                    payload = json.dumps({"errors": [{"message": "Too Many Requests." if status == 429 else "Server Error", "status": status}]}).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                stub.record(len(payload))
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                if self.inject("image"):
+                    return
+                payload = fixture_image(self.path)
+                self.send_response(200)
+                self.send_header("Content-Type", "image/jpeg")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                with stub._lock:
+                    stub.images_served += 1
+                    stub.bytes_sent += len(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,44 @@
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ANILIST_RATE_BURST", "100000")
+os.environ.setdefault("ANILIST_USER_RATE_BURST", "100000")
+
+import app
+from anilist_stub import AniListStub
+
+LIST_SIZES = [10, 1000, 10000]
+ROUNDS = 15
+COLLECTION_QUERY = '''query ($userName: String, $type: MediaType, $sort: [MediaListSort]) { MediaListCollection(userName: $userName, type: $type, sort: $sort, forceSingleCompletedList: true) { lists { name entries { updatedAt progress media { id title { romaji english } coverImage { large } bannerImage type format } } } } }'''
+
+
+def collection_fetch(media_type="ANIME"):
+    variables = {'userName': app.ANILIST_USERNAME, 'type': media_type, 'sort': 'UPDATED_TIME_DESC'}
+    data = app.get_anilist_data(COLLECTION_QUERY, variables)
+    all_entries = []
+    for lst in data['data']['MediaListCollection']['lists']:
+        all_entries.extend(lst['entries'])
+    all_entries.sort(key=lambda x: x.get('updatedAt', 0), reverse=True)
+    return all_entries[0]
+
+
+def measure(stub, fetch):
+    timings = []
+    for _ in range(ROUNDS):
+        app.USERS.get(app.ANILIST_USERNAME).snapshot_cache.clear(); start = time.perf_counter(); entry = fetch(); timings.append((time.perf_counter() - start) * 1000)
+    return entry, stub.last_payload_bytes, statistics.median(timings)
+
+
+if __name__ == '__main__':
+    print(f"{'entries':>8} | {'path':<10} | {'payload':>12} | {'median ms':>9}")
+    for size in LIST_SIZES:
+        with AniListStub(list_size=size) as stub:
+            app.ANILIST_API_URL = stub.url
+            old_entry, old_bytes, old_ms = measure(stub, collection_fetch)
+            new_entry, new_bytes, new_ms = measure(stub, app.get_last_updated_media_for_activity)
+            assert old_entry == new_entry, "lean fetch returned a different entry"
+            print(f"{size:>8} | {'collection':<10} | {old_bytes:>10} B | {old_ms:>9.2f}")
+            print(f"{size:>8} | {'snapshot':<10} | {new_bytes:>10} B | {new_ms:>9.2f}")
@@ -0,0 +1,38 @@
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+from anilist_stub import AniListStub
+from asset_cache import AssetCache
+
+ROUNDS = 10
+
+
+def render_cards():
+    entry = app.get_last_updated_media_for_activity("ANIME")
+    app.generate_activity_image(entry, "ANIME")
+    app.generate_recently_completed_image(app.get_recently_completed_anime_with_score())
+
+
+if __name__ == '__main__':
+    cache_dir = tempfile.mkdtemp(prefix="bench_assets_")
+    try:
+        with AniListStub(list_size=50) as stub:
+            app.ANILIST_API_URL = stub.url
+            app.ASSET_CACHE = AssetCache(directory=cache_dir)
+            start = time.perf_counter(); render_cards(); cold_ms = (time.perf_counter() - start) * 1000
+            cold_images = stub.images_served
+            timings = []
+            for _ in range(ROUNDS):
+                start = time.perf_counter(); render_cards(); timings.append((time.perf_counter() - start) * 1000)
+            print(f"cold render: {cold_ms:8.2f} ms, {cold_images} asset downloads")
+            print(f"warm render: {statistics.median(timings):8.2f} ms median, {stub.images_served - cold_images} asset downloads")
+            print(f"derivative hits/misses: {app.ASSET_CACHE.hits}/{app.ASSET_CACHE.misses}")
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
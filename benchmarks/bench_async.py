@@ -0,0 +1,140 @@
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import httpx
+
+from anilist_stub import AniListStub, fixture_image
+
+ROUTES = ["last_anime.png", "last_manga.png", "anime_goal_progress.png", "recently_completed_anime.png"]
+SERVER_ENV = {
+    "ANILIST_USERNAME": "bench_user",
+    "ANILIST_RATE_BURST": "100000",
+    "ANILIST_USER_RATE_BURST": "100000",
+    "USER_CACHE_MAX_USERS": "100000",
+    "USER_CACHE_MEMORY_BUDGET": str(1024 * 1024 * 1024),
+    "CARD_FORMAT_NEGOTIATION": "0",
+}
+
+
+def serve_sync(port, threads):
+    from werkzeug.serving import BaseWSGIServer
+
+    import app
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    class PooledWSGIServer(BaseWSGIServer):
+        request_queue_size = 4096
+
+        def __init__(self, *args):
+            super().__init__(*args)
+            self.pool = ThreadPoolExecutor(max_workers=threads)
+
+        def process_request(self, request, client_address):
+            self.pool.submit(self._process, request, client_address)
+
+        def _process(self, request, client_address):
+            try: self.finish_request(request, client_address)
+            except Exception: self.handle_error(request, client_address)
+            finally: self.shutdown_request(request)
+
+    PooledWSGIServer("127.0.0.1", port, app.app).serve_forever()
+
+
+def serve_async(port):
+    import uvicorn
+
+    import asgi
+    uvicorn.run(asgi.application, host="127.0.0.1", port=port, backlog=4096, log_level="warning")
+
+
+def start_server(mode, stub_url, threads):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0)); port = sock.getsockname()[1]
+    env = dict(os.environ, ASSET_CACHE_DIR=tempfile.mkdtemp(prefix="bench_assets_"), ASYNC_RENDER_WORKERS=str(threads), **SERVER_ENV)
+    process = subprocess.Popen([sys.executable, __file__, "--serve", mode, "--port", str(port), "--stub-url", stub_url, "--threads", str(threads)], env=env)
+    base = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            if httpx.get(base + "/").status_code == 200: return process, base
+        except httpx.HTTPError: time.sleep(0.1)
+    process.kill(); raise RuntimeError(f"{mode} server did not start")
+
+
+async def fetch(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode()); await writer.drain()
+        return int((await reader.readline()).split()[1]), len(await reader.read())
+    finally:
+        writer.close()
+
+
+async def drive(base, paths, concurrency):
+    host, port = base.rsplit("/", 1)[-1].split(":")
+    timings, errors = [], 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def hit(path):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try: errors += (await fetch(host, int(port), path))[0] != 200
+            except (OSError, IndexError, ValueError): errors += 1
+            timings.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(hit(path) for path in paths))
+    wall = time.perf_counter() - start
+    cuts = statistics.quantiles(timings, n=100)
+    return {"requests": len(paths), "errors": errors, "p50": statistics.median(timings), "p99": cuts[98], "throughput": len(paths) / wall}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the threaded WSGI app with the ASGI mode against a slow AniList stub.")
+    parser.add_argument("--users", type=int, default=100, help="distinct users; each user hits all four routes")
+    parser.add_argument("--concurrency", type=int, default=256)
+    parser.add_argument("--threads", type=int, default=8, help="WSGI worker threads, and render executor size for the ASGI mode")
+    parser.add_argument("--upstream-delay", type=float, default=0.3, help="seconds added to every GraphQL and image response")
+    parser.add_argument("--list-size", type=int, default=100)
+    parser.add_argument("--serve", choices=["sync", "async"], help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--stub-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        import app
+        app.ANILIST_API_URL = args.stub_url
+        return serve_sync(args.port, args.threads) if args.serve == "sync" else serve_async(args.port)
+
+    print(f"{args.users} users x {len(ROUTES)} routes, {args.concurrency} concurrent clients, {args.threads} workers, upstream delay {args.upstream_delay * 1000:.0f} ms")
+    print(f"{'server':<6} | {'run':<4} | {'req':>5} | {'err':>3} | {'p50 ms':>8} | {'p99 ms':>8} | {'req/s':>7}")
+    paths = [f"/u/user{i:05d}/{route}" for i in range(args.users) for route in ROUTES]
+    for mode in ("sync", "async"):
+        with AniListStub(list_size=0) as images, AniListStub(list_size=args.list_size, image_base=f"{images.url}/media", per_user=True) as graphql:
+            for stub in (images, graphql):
+                stub.graphql_fault = stub.image_fault = "slow"; stub.fault_delay = args.upstream_delay
+            for entry in graphql.entries["ANIME"] + graphql.entries["MANGA"]:
+                fixture_image(urlsplit(entry["media"]["coverImage"]["large"]).path); fixture_image(urlsplit(entry["media"]["bannerImage"]).path)
+            process, base = start_server(mode, graphql.url, args.threads)
+            try:
+                for phase in ("cold", "warm"):
+                    r = asyncio.run(drive(base, paths, args.concurrency))
+                    print(f"{mode:<6} | {phase:<4} | {r['requests']:>5} | {r['errors']:>3} | {r['p50']:>8.1f} | {r['p99']:>8.1f} | {r['throughput']:>7.1f}")
+            finally:
+                process.terminate(); process.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ASSET_CACHE_DIR", tempfile.mkdtemp(prefix="bench_assets_"))
+os.environ.setdefault("ANILIST_USERNAME", "bench_user")
+os.environ.setdefault("ANILIST_RATE_BURST", "1000")
+os.environ.setdefault("ANILIST_USER_RATE_BURST", "1000")
+
+import app
+from anilist_stub import AniListStub, fixture_image
+
+USERS = 20
+UPSTREAM_DELAY = 0.05
+SEPARATE = ["last_anime.png", "anime_goal_progress.png", "recently_completed_anime.png"]
+
+
+def page_view(client, user, paths):
+    with ThreadPoolExecutor(max_workers=len(paths)) as pool:
+        responses = list(pool.map(lambda path: client.get(f"/u/{user}/{path}", headers={"Accept": "image/webp"}), paths))
+    assert all(r.status_code == 200 for r in responses)
+    return sum(len(r.data) for r in responses)
+
+
+def run(label, client, stubs, paths, prefix, clear_renders=False):
+    graphql, images = stubs
+    timings, served = [], 0
+    attempts = graphql.graphql_attempts, images.image_attempts
+    for i in range(USERS):
+        if clear_renders: app.USERS.get(f"{prefix}{i:03d}").render_cache.clear()
+        start = time.perf_counter(); served += page_view(client, f"{prefix}{i:03d}", paths); timings.append((time.perf_counter() - start) * 1000)
+    print(f"{label:<34} | {len(paths):>4} | {statistics.median(timings):>7.1f} | {max(timings):>7.1f} | "
+          f"{(graphql.graphql_attempts - attempts[0]) / USERS:>7.1f} | {(images.image_attempts - attempts[1]) / USERS:>6.1f} | {served / USERS / 1024:>6.1f}")
+
+
+if __name__ == '__main__':
+    with AniListStub(list_size=0) as images, AniListStub(list_size=60, image_base=f"{images.url}/media", per_user=True) as graphql:
+        for stub in (images, graphql):
+            stub.graphql_fault = stub.image_fault = "slow"; stub.fault_delay = UPSTREAM_DELAY
+        for entry in graphql.entries["ANIME"] + graphql.entries["MANGA"]:
+            fixture_image(urlsplit(entry["media"]["coverImage"]["large"]).path); fixture_image(urlsplit(entry["media"]["bannerImage"]).path)
+        app.ANILIST_API_URL = graphql.url
+        client = app.app.test_client()
+        print(f"{USERS} cold users per row, {UPSTREAM_DELAY * 1000:.0f} ms added to every upstream response")
+        print(f"{'page view':<34} | {'reqs':>4} | {'p50 ms':>7} | {'max ms':>7} | {'gql/user':>7} | {'img/u':>6} | {'KB/u':>6}")
+        run("three cards, parallel requests", client, (graphql, images), SEPARATE, "sep")
+        run("composite of the same three cards", client, (graphql, images), ["composite.png"], "cmp")
+        run("completed grid, top 10", client, (graphql, images), ["completed_grid.png?n=10"], "grid")
+        run("completed grid, cached cover tiles", client, (graphql, images), ["completed_grid.png?n=10"], "grid", clear_renders=True)
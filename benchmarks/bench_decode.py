@@ -0,0 +1,60 @@
+import os
+import statistics
+import sys
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageChops, ImageStat
+
+import app
+import card_engine
+from anilist_stub import fixture_image
+
+ROUNDS = 20
+MAX_PIXEL_DIFF = 16
+MAX_MEAN_DIFF = 1.0
+CASES = [
+    ("banner 1900x400", "/media/anime/banner/1.jpg", None, app.CARD_SPECS["activity"]["size"]),
+    ("cover 460x650", "/media/anime/cover/large/bx1.jpg", None, app.CARD_SPECS["activity"]["cover_size"]),
+    ("cover 230x325", "/media/anime/cover/large/bx2.jpg", (230, 325), app.CARD_SPECS["completed"]["cover_size"]),
+]
+
+
+def full_decode(data, size, crop):
+    raw = Image.open(BytesIO(data)).convert("RGBA"); decoded_size = raw.size
+    if crop: raw = card_engine.crop_to_aspect(raw, *size)
+    return raw.resize(size, Image.Resampling.LANCZOS), decoded_size
+
+
+def draft_decode(data, size, crop):
+    raw = Image.open(BytesIO(data))
+    box = card_engine.aspect_crop_box(raw.size, *size) if crop else None
+    image = card_engine.decode_scaled(raw, size, box)
+    return image, raw.size
+
+
+def timed(fn, *args):
+    timings = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter(); result = fn(*args); timings.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(timings)
+
+
+if __name__ == '__main__':
+    failed = False
+    print(f"{'asset':<16} | {'full ms':>8} | {'draft ms':>8} | {'decoded px full':>15} | {'decoded px draft':>16} | {'max diff':>8} | {'mean diff':>9}")
+    for name, path, resize_to, size in CASES:
+        data = fixture_image(path)
+        if resize_to:
+            out = BytesIO(); Image.open(BytesIO(data)).resize(resize_to).save(out, "JPEG", quality=90); data = out.getvalue()
+        crop = "banner" in name
+        (old, old_px), old_ms = timed(full_decode, data, size, crop)
+        (new, new_px), new_ms = timed(draft_decode, data, size, crop)
+        diff = ImageChops.difference(old.convert("RGB"), new.convert("RGB"))
+        max_diff = max(band_max for _, band_max in diff.getextrema()); mean_diff = max(ImageStat.Stat(diff).mean)
+        failed |= max_diff > MAX_PIXEL_DIFF or mean_diff > MAX_MEAN_DIFF
+        print(f"{name:<16} | {old_ms:>8.2f} | {new_ms:>8.2f} | {old_px[0] * old_px[1]:>15} | {new_px[0] * new_px[1]:>16} | {max_diff:>8} | {mean_diff:>9.3f}")
+    print("pixel diff within tolerance" if not failed else "PIXEL DIFF ABOVE TOLERANCE")
+    sys.exit(1 if failed else 0)
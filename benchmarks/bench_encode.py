@@ -0,0 +1,48 @@
+import os
+import statistics
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ASSET_CACHE_DIR", tempfile.mkdtemp(prefix="bench_assets_"))
+
+import app
+from anilist_stub import AniListStub
+from encoding import AVAILABLE_FORMATS, encode_image
+
+ROUNDS = 30
+
+
+def encode_default_png(image, fmt):
+    buf = BytesIO(); image.save(buf, "PNG"); return buf.getvalue()
+
+
+VARIANTS = [
+    ("png (default)", "png", {}, encode_default_png),
+    ("png", "png", {}, encode_image),
+    ("png palette", "png", {"palette": True}, encode_image),
+    ("webp", "webp", {}, encode_image),
+    ("webp lossless", "webp", {"lossless": True}, encode_image),
+    ("avif", "avif", {}, encode_image),
+]
+
+
+def bench(card, image):
+    for label, fmt, kwargs, encode in VARIANTS:
+        if fmt not in AVAILABLE_FORMATS: continue
+        data = encode(image, fmt, **kwargs); timings = []
+        for _ in range(ROUNDS):
+            start = time.perf_counter(); encode(image, fmt, **kwargs); timings.append((time.perf_counter() - start) * 1000)
+        print(f"{card:<20} | {label:<14} | {len(data):>8} | {statistics.median(timings):>8.2f}")
+
+
+if __name__ == '__main__':
+    with AniListStub(list_size=50) as stub:
+        app.ANILIST_API_URL = stub.url
+        anime = app.get_last_updated_media_for_activity("ANIME")
+        print(f"{'card':<20} | {'encoding':<14} | {'bytes':>8} | {'p50 ms':>8}")
+        bench("activity", app.generate_activity_image(anime, "ANIME"))
+        bench("goal", app.generate_goal_progress_image_combined(app.get_completed_anime_count_for_goal()))
+        bench("recently completed", app.generate_recently_completed_image(app.get_recently_completed_anime_with_score()))
@@ -0,0 +1,46 @@
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ASSET_CACHE_DIR", tempfile.mkdtemp(prefix="bench_assets_"))
+
+import app
+import card_engine
+from anilist_stub import AniListStub
+
+ROUNDS = 100
+SCALES = (1, 2, 3)
+
+
+def median_ms(fn, before=lambda: None):
+    timings = []
+    for _ in range(ROUNDS):
+        before(); start = time.perf_counter(); fn(); timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def run(stub):
+    app.ANILIST_API_URL = stub.url
+    cards = {
+        "activity": (app.get_last_updated_media_for_activity("ANIME"), "ANIME"),
+        "goal": app.get_completed_anime_count_for_goal(),
+        "completed": app.get_recently_completed_anime_with_score(),
+        "grid": (app.get_recently_completed_entries(), None),
+    }
+    print(f"{'card':<10} | {'scale':>5} | {'size':>10} | {'compile ms':>10} | {'render ms':>9} | {'per-call share':>14}")
+    for card, data in cards.items():
+        spec = app.CARD_SPECS[card]
+        for scale in SCALES:
+            assets, _ = app.fetch_card_assets(app.card_asset_loaders(card, data, scale))
+            render = lambda: card_engine.render_card(spec, data, {name: image.copy() for name, image in assets.items() if image}, scale)
+            compile_ms = median_ms(lambda: card_engine.compile_card(spec, scale), card_engine._layouts.clear)
+            size = render().size; render_ms = median_ms(render)
+            print(f"{card:<10} | {scale:>5} | {f'{size[0]}x{size[1]}':>10} | {compile_ms:>10.3f} | {render_ms:>9.3f} | {compile_ms / (compile_ms + render_ms):>13.0%}")
+
+
+if __name__ == '__main__':
+    with AniListStub(list_size=50) as stub:
+        run(stub)
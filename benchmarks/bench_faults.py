@@ -0,0 +1,89 @@
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ASSET_CACHE_DIR", tempfile.mkdtemp(prefix="bench_assets_"))
+os.environ.setdefault("ANILIST_USERNAME", "bench_user")
+os.environ.setdefault("ANILIST_USER_RATE_BURST", "1000")
+os.environ.setdefault("ANILIST_BREAKER_FAILURES", "3")
+os.environ.setdefault("ANILIST_BREAKER_RESET", "1")
+
+import app
+from anilist_stub import AniListStub
+
+REQUEST_DEADLINE = 2.0
+
+
+def timed_get(client, path):
+    start = time.perf_counter(); response = client.get(path); elapsed = time.perf_counter() - start
+    return response, elapsed
+
+
+def report(name, ok, detail):
+    print(f"{'PASS' if ok else 'FAIL'} | {name:<44} | {detail}")
+    return ok
+
+
+def fresh_state(stub):
+    stub.graphql_fault = stub.image_fault = None
+    app.ASSET_CACHE = app.AssetCache(tempfile.mkdtemp(prefix="bench_assets_"))
+    app.USERS.get(app.ANILIST_USERNAME).snapshot_cache.clear(); app.USERS.get(app.ANILIST_USERNAME).render_cache.clear()
+    app.ANILIST_BREAKER.record_success()
+
+
+def slow_banner_host(stub, client):
+    fresh_state(stub); stub.image_fault = "slow"; stub.fault_delay = 10
+    response, elapsed = timed_get(client, "/last_anime.png")
+    return report("slow asset host stays within request deadline", response.status_code == 200 and elapsed < REQUEST_DEADLINE + 0.5,
+                  f"status {response.status_code}, {elapsed:.2f}s (deadline {REQUEST_DEADLINE}s)")
+
+
+def negative_cache(stub, client):
+    fresh_state(stub); stub.image_fault = "reset"
+    client.get("/last_anime.png"); first = stub.image_attempts
+    app.USERS.get(app.ANILIST_USERNAME).render_cache.clear()
+    response, elapsed = timed_get(client, "/last_anime.png")
+    retried = stub.image_attempts - first
+    return report("reset asset URLs are cached negatively", response.status_code == 200 and retried == 0,
+                  f"{first} attempts on first request, {retried} on second, {app.ASSET_CACHE.negative_hits} negative hits")
+
+
+def breaker_fails_over(stub, client):
+    fresh_state(stub); app.CACHE_CONFIG["ttl_snapshot"] = 1
+    client.get("/last_anime.png"); time.sleep(1.1)
+    stub.graphql_fault = 503; app.ANILIST_CLIENT_CONFIG["max_retries"] = 0
+    for _ in range(app.ANILIST_CLIENT_CONFIG["breaker_failures"] + 2):
+        client.get("/last_anime.png"); time.sleep(0.05)
+    attempts = stub.graphql_attempts
+    response, elapsed = timed_get(client, "/last_anime.png?format=png"); time.sleep(0.1)
+    ok = report("circuit opens on 5xx and serves cached data", app.ANILIST_BREAKER.state == "open" and stub.graphql_attempts == attempts and response.status_code == 200,
+                f"breaker {app.ANILIST_BREAKER.state}, {stub.graphql_attempts - attempts} upstream calls while open, {elapsed * 1000:.1f} ms")
+    stub.graphql_fault = None; time.sleep(app.ANILIST_CLIENT_CONFIG["breaker_reset"] + 0.1)
+    app.USERS.get(app.ANILIST_USERNAME).snapshot_cache.clear(); client.get("/last_anime.png")
+    ok &= report("circuit closes after a successful probe", app.ANILIST_BREAKER.state == "closed", f"breaker {app.ANILIST_BREAKER.state}")
+    app.CACHE_CONFIG["ttl_snapshot"] = 60
+    return ok
+
+
+def reset_graphql(stub, client):
+    fresh_state(stub); stub.graphql_fault = "reset"
+    response, elapsed = timed_get(client, "/anime_goal_progress.png")
+    return report("graphql connection resets degrade to a card", response.status_code == 200 and elapsed < REQUEST_DEADLINE + 0.5, f"status {response.status_code}, {elapsed:.2f}s")
+
+
+def slow_graphql(stub, client):
+    fresh_state(stub); stub.graphql_fault = "slow"; stub.fault_delay = 10
+    response, elapsed = timed_get(client, "/recently_completed_anime.png")
+    return report("slow graphql is cut off by the deadline", response.status_code == 200 and elapsed < REQUEST_DEADLINE + 0.5, f"status {response.status_code}, {elapsed:.2f}s")
+
+
+if __name__ == '__main__':
+    app.STYLE_CONFIG["request_deadline"] = REQUEST_DEADLINE
+    with AniListStub(list_size=20) as stub:
+        app.ANILIST_API_URL = stub.url
+        client = app.app.test_client()
+        results = [scenario(stub, client) for scenario in (slow_banner_host, negative_cache, slow_graphql, reset_graphql, breaker_fails_over)]
+        stub.graphql_fault = stub.image_fault = None
+    sys.exit(0 if all(results) else 1)
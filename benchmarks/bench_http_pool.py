@@ -0,0 +1,35 @@
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+import http_client
+from anilist_stub import AniListStub
+
+CALLS = 200
+WORKERS = 8
+QUERY = '''query ($userName: String, $type: MediaType, $sort: [MediaListSort]) { Page(page: 1, perPage: 1) { mediaList(userName: $userName, type: $type, sort: $sort) { updatedAt } } }'''
+
+
+def run(post, url):
+    body = {"query": QUERY, "variables": {"type": "ANIME"}}
+    def call(_):
+        start = time.perf_counter(); post(url, json=body, timeout=5).raise_for_status(); return (time.perf_counter() - start) * 1000
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        start = time.perf_counter(); timings = list(pool.map(call, range(CALLS))); total = time.perf_counter() - start
+    return timings, total
+
+
+if __name__ == '__main__':
+    print(f"{'client':<10} | {'connections':>11} | {'p50 ms':>7} | {'p95 ms':>7} | {'req/s':>7}")
+    for name, post in (("requests", requests.post), ("pooled", http_client.http_post)):
+        with AniListStub(list_size=10) as stub:
+            timings, total = run(post, stub.url)
+            p95 = statistics.quantiles(timings, n=20)[-1]
+            print(f"{name:<10} | {stub.connections_opened:>11} | {statistics.median(timings):>7.2f} | {p95:>7.2f} | {CALLS / total:>7.0f}")
+        http_client.close_sessions()
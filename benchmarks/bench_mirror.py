@@ -0,0 +1,73 @@
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ASSET_CACHE_DIR", tempfile.mkdtemp(prefix="bench_assets_"))
+
+import app
+from anilist_stub import AniListStub
+from list_mirror import ListMirror
+
+LIST_SIZES = [10, 1000]
+
+
+def card_inputs(username):
+    return (app.get_last_updated_media_for_activity("ANIME", username), app.get_last_updated_media_for_activity("MANGA", username),
+            app.get_recently_completed_anime_with_score(username), app.get_completed_anime_count_for_goal(username))
+
+
+def rendered(inputs):
+    anime, manga, completed_entry, completed = inputs
+    images = [app.generate_activity_image(anime, "ANIME"), app.generate_activity_image(manga, "MANGA"),
+              app.generate_recently_completed_image(completed_entry), app.generate_goal_progress_image_combined(completed)]
+    return [image.tobytes() for image in images]
+
+
+def measure(label, stub, fn):
+    requests, sent = stub.requests_served, stub.bytes_sent
+    start = time.perf_counter(); result = fn(); elapsed = (time.perf_counter() - start) * 1000
+    print(f"{label:<38} | {stub.requests_served - requests:>8} | {stub.bytes_sent - sent:>10} | {elapsed:>8.1f}")
+    return result
+
+
+def expire(user_state):
+    user_state.snapshot_cache.clear()
+    with app.LIST_MIRROR._connect() as conn:
+        conn.execute("UPDATE sync_state SET last_sync = 0")
+
+
+def snapshot_inputs(username):
+    app.USERS.get(username).snapshot_cache.clear(); app.LIST_MIRROR, mirror = None, app.LIST_MIRROR
+    try: return card_inputs(username)
+    finally: app.LIST_MIRROR = mirror
+
+
+def background_sync(username):
+    job = app.MIRROR_SYNCS.get(username.lower())
+    return job.result() if job else None
+
+
+if __name__ == '__main__':
+    for size in LIST_SIZES:
+        username = f"bench_user_{size}"
+        with AniListStub(list_size=size) as stub:
+            app.ANILIST_API_URL = stub.url
+            app.LIST_MIRROR = None
+            user = app.USERS.get(username); user.snapshot_cache.clear()
+            print(f"\nlist size {size}, default rate limits\n{'refresh':<38} | {'requests':>8} | {'bytes':>10} | {'ms':>8}")
+            snapshot = measure("snapshot query", stub, lambda: card_inputs(username))
+            app.LIST_MIRROR = ListMirror(os.path.join(tempfile.mkdtemp(prefix="bench_mirror_"), "mirror.db"))
+            pending = measure("mirror: cards during first sync", stub, lambda: card_inputs(username))
+            assert rendered(pending) == rendered(snapshot), "cards served during the first sync differ from snapshot cards"
+            measure("mirror: background full sync", stub, lambda: background_sync(username))
+            assert app.LIST_MIRROR.ready(username), "first full sync did not complete"
+            mirrored = measure("mirror: after full sync", stub, lambda: card_inputs(username))
+            assert rendered(mirrored) == rendered(snapshot), "mirror cards differ from snapshot cards"
+            for changes in (0, 3, 25):
+                stub.touch("ANIME", changes); expire(user)
+                measure(f"mirror: cards while {changes} changes sync", stub, lambda: card_inputs(username))
+                measure(f"mirror: background delta, {changes} changes", stub, lambda: background_sync(username))
+                assert rendered(card_inputs(username)) == rendered(snapshot_inputs(username)), "mirror cards differ from snapshot cards"
+            print(f"sync state: {app.LIST_MIRROR.stats(username)}")
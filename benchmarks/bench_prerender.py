@@ -0,0 +1,46 @@
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ASSET_CACHE_DIR", tempfile.mkdtemp(prefix="bench_assets_"))
+os.environ.setdefault("ANILIST_USERNAME", "bench_user")
+
+import app
+from anilist_stub import AniListStub
+from encoding import encode_image
+from prerender import PrerenderScheduler
+
+ROUNDS = 200
+ROUTES = ["/last_anime.png", "/anime_goal_progress.png", "/recently_completed_anime.png"]
+
+
+def bench(label, client, path, before=None):
+    timings = []
+    for _ in range(ROUNDS):
+        if before: before()
+        start = time.perf_counter()
+        assert client.get(path, headers={"Accept": "image/webp"}).status_code == 200
+        timings.append((time.perf_counter() - start) * 1000)
+    print(f"{path:<32} | {label:<22} | {statistics.median(timings):>7.3f} | {statistics.quantiles(timings, n=20)[-1]:>7.3f}")
+
+
+if __name__ == '__main__':
+    with AniListStub(list_size=50) as stub:
+        app.ANILIST_API_URL = stub.url
+        client = app.app.test_client()
+        user = app.USERS.get(app.ANILIST_USERNAME)
+        print(f"{'route':<32} | {'mode':<22} | {'p50 ms':>7} | {'p95 ms':>7}")
+        for path in ROUTES:
+            app.PRERENDER = None
+            bench("request-time, cold", client, path, before=user.render_cache.clear)
+            bench("request-time, cached", client, path)
+        scheduler = PrerenderScheduler(app._prerender_jobs(app.PRERENDER_CONFIG["cards"]), encode_image)
+        for name in scheduler.jobs: scheduler.refresh(name)
+        app.PRERENDER = scheduler
+        for path in ROUTES:
+            bench("prerendered", client, path)
+        for name in scheduler.jobs: scheduler.refresh(name)
+        print(f"scheduler: {scheduler.stats()['renders']} renders, {scheduler.stats()['unchanged']} unchanged refreshes, {scheduler.served} served")
@@ -0,0 +1,59 @@
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ASSET_CACHE_DIR", tempfile.mkdtemp(prefix="bench_assets_"))
+
+import app
+from anilist_stub import AniListStub
+from rate_limit import TokenBucket
+
+ROUTES = ['/last_anime.png', '/last_manga.png', '/anime_goal_progress.png', '/recently_completed_anime.png']
+BURST_CALLS = 120
+
+
+def report(name, ok, detail):
+    print(f"{'PASS' if ok else 'FAIL'} | {name:<44} | {detail}")
+    return ok
+
+
+def fallback_scenario():
+    with AniListStub(list_size=100) as stub:
+        app.ANILIST_API_URL = stub.url
+        app.CACHE_CONFIG["ttl_snapshot"] = 1; user = app.USERS.get(app.ANILIST_USERNAME); user.snapshot_cache.max_stale = 0
+        client = app.app.test_client()
+        good = {route: client.get(route).headers['ETag'] for route in ROUTES}
+        time.sleep(1.1)
+        stub.force_status = 429
+        served_good = 0
+        for _ in range(10):
+            for route in ROUTES:
+                resp = client.get(route)
+                served_good += resp.status_code == 200 and resp.headers['ETag'] == good[route]
+        attempts, shed = stub.requests_served - 1, app.ANILIST_RATE_LIMITER.shed + user.limiter.shed
+        ok = report("cards served from last good data on 429", served_good == 10 * len(ROUTES),
+                    f"{served_good}/{10 * len(ROUTES)} cards, {user.snapshot_cache.fallbacks} cache fallbacks")
+        ok &= report("queued refreshes shed client-side after 429", attempts <= 1 and shed > 0,
+                     f"{attempts} upstream attempts, {stub.throttled} 429s, {shed} shed client-side")
+        return ok
+
+
+def burst_scenario():
+    with AniListStub(list_size=10, rate_limit=90) as stub:
+        app.ANILIST_API_URL = stub.url
+        app.ANILIST_RATE_LIMITER = TokenBucket(90, burst=30)
+        app.ANILIST_CLIENT_CONFIG["max_queue_wait"] = 0.5
+        start = time.perf_counter(); ok = 0
+        for i in range(BURST_CALLS):
+            ok += app.get_anilist_data(app.USER_SNAPSHOT_QUERY, {'userName': f"burst-{i}"}) is not None
+        elapsed = time.perf_counter() - start
+        shed = app.ANILIST_RATE_LIMITER.shed
+        return report("burst stays under the upstream rate limit", stub.throttled == 0 and shed > 0 and ok + shed == BURST_CALLS,
+                      f"{BURST_CALLS} fetches in {elapsed:.1f}s: {ok} answered, {shed} shed client-side, {stub.throttled} 429s from upstream")
+
+
+if __name__ == '__main__':
+    results = [fallback_scenario(), burst_scenario()]
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,41 @@
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ASSET_CACHE_DIR", tempfile.mkdtemp(prefix="bench_assets_"))
+
+import app
+from anilist_stub import AniListStub
+
+ROUNDS = 200
+
+
+def bench(name, fn):
+    fn()
+    timings = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter(); fn(); timings.append((time.perf_counter() - start) * 1000)
+    cuts = statistics.quantiles(timings, n=100)
+    print(f"{name:<28} | {statistics.median(timings):>7.3f} | {cuts[94]:>7.3f} | {cuts[98]:>7.3f}")
+
+
+def run(stub):
+    app.ANILIST_API_URL = stub.url
+    anime = app.get_last_updated_media_for_activity("ANIME")
+    completed_entry = app.get_recently_completed_anime_with_score()
+    completed = app.get_completed_anime_count_for_goal()
+    no_banner = dict(anime, media=dict(anime['media'], bannerImage=None))
+    print(f"{'card (warm assets)':<28} | {'p50 ms':>7} | {'p95 ms':>7} | {'p99 ms':>7}")
+    bench("activity", lambda: app.generate_activity_image(anime, "ANIME"))
+    bench("activity (no banner)", lambda: app.generate_activity_image(no_banner, "ANIME"))
+    bench("activity (no data)", lambda: app.generate_activity_image(None, "ANIME"))
+    bench("goal", lambda: app.generate_goal_progress_image_combined(completed))
+    bench("recently completed", lambda: app.generate_recently_completed_image(completed_entry))
+
+
+if __name__ == '__main__':
+    with AniListStub(list_size=50) as stub:
+        run(stub)
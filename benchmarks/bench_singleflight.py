@@ -0,0 +1,32 @@
+import os
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ASSET_CACHE_DIR", tempfile.mkdtemp(prefix="bench_assets_"))
+
+import app
+from anilist_stub import AniListStub
+
+CONCURRENCY = 50
+
+
+if __name__ == '__main__':
+    with AniListStub(list_size=1000) as stub:
+        app.ANILIST_API_URL = stub.url
+        barrier = threading.Barrier(CONCURRENCY)
+        statuses = []
+
+        def hit():
+            client = app.app.test_client()
+            barrier.wait()
+            statuses.append(client.get('/last_anime.png').status_code)
+
+        threads = [threading.Thread(target=hit) for _ in range(CONCURRENCY)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        print(f"{CONCURRENCY} concurrent /last_anime.png -> statuses {sorted(set(statuses))}")
+        print(f"graphql requests sent: {stub.requests_served}, asset downloads: {stub.images_served}")
+        print(f"anilist fetch: {app.ANILIST_FLIGHT.stats()}")
+        print(f"card render:   {app.RENDER_FLIGHT.stats()}")
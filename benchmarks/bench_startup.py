@@ -0,0 +1,41 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from anilist_stub import AniListStub
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = 7
+ROUTES = ['/', '/last_anime.png', '/last_manga.png', '/anime_goal_progress.png', '/recently_completed_anime.png']
+CHILD = '''
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+resp = app.app.test_client().get(sys.argv[1])
+done = time.perf_counter()
+print(json.dumps({"import": imported - start, "first": done - start, "status": resp.status_code, "fonts": len(app.FONTS._fonts)}))
+'''
+
+
+def run_child(route, env):
+    out = subprocess.run([sys.executable, "-c", CHILD, route], cwd=REPO_DIR, env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    with AniListStub(list_size=50) as stub:
+        print(f"{'route':<30} | {'warmup':>6} | {'import ms':>9} | {'first image ms':>14} | {'fonts loaded':>12}")
+        for warmup in ("0", "1"):
+            for route in ROUTES:
+                env = dict(os.environ, ANILIST_API_URL=stub.url, FONT_WARMUP=warmup, ASSET_CACHE_DIR=tempfile.mkdtemp(prefix="bench_assets_"))
+                run_child(route, env)
+                results = [run_child(route, env) for _ in range(RUNS)]
+                import_ms = statistics.median(r["import"] for r in results) * 1000
+                first_ms = statistics.median(r["first"] for r in results) * 1000
+                print(f"{route:<30} | {warmup:>6} | {import_ms:>9.1f} | {first_ms:>14.1f} | {results[-1]['fonts']:>12}")
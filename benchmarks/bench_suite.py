@@ -0,0 +1,99 @@
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+LIST_SIZES = [10, 1000, 10000]
+ROUTES = ["last_anime.png", "last_manga.png", "anime_goal_progress.png", "recently_completed_anime.png"]
+WORKER_ENV = {
+    "ANILIST_USERNAME": "bench_user",
+    "ANILIST_RATE_BURST": "100000",
+    "ANILIST_USER_RATE_BURST": "100000",
+    "USER_CACHE_MAX_USERS": "100000",
+    "USER_CACHE_MEMORY_BUDGET": str(1024 * 1024 * 1024),
+}
+
+
+def drive(client, paths, concurrency):
+    timings, response_bytes, errors = [], 0, 0
+    lock = threading.Lock()
+
+    def hit(path):
+        nonlocal response_bytes, errors
+        start = time.perf_counter(); response = client.get(path, headers={"Accept": "image/webp,image/png"}); elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            timings.append(elapsed); response_bytes += len(response.data); errors += response.status_code != 200
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(hit, paths))
+    wall = time.perf_counter() - start
+    cuts = statistics.quantiles(timings, n=100)
+    return {"requests": len(paths), "errors": errors, "p50": statistics.median(timings), "p95": cuts[94], "p99": cuts[98],
+            "throughput": len(paths) / wall, "response_bytes": response_bytes}
+
+
+def worker(list_size, users, concurrency):
+    import app
+    from anilist_stub import AniListStub
+
+    with AniListStub(list_size=0) as images, AniListStub(list_size=list_size, image_base=f"{images.url}/media", per_user=True) as graphql:
+        app.ANILIST_API_URL = graphql.url
+        client = app.app.test_client()
+        paths = [f"/u/user{i:05d}/{route}" for i in range(users) for route in ROUTES]
+        results = {}
+        for phase in ("cold", "warm"):
+            graphql_bytes, image_bytes = graphql.bytes_sent, images.bytes_sent
+            result = drive(client, paths, concurrency)
+            result["graphql_bytes"], result["image_bytes"] = graphql.bytes_sent - graphql_bytes, images.bytes_sent - image_bytes
+            result["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            results[phase] = result
+    print(json.dumps(results))
+
+
+def run_size(list_size, users, concurrency):
+    env = dict(os.environ, ASSET_CACHE_DIR=tempfile.mkdtemp(prefix="bench_assets_"), **WORKER_ENV)
+    output = subprocess.run([sys.executable, __file__, "--worker", str(list_size), "--users", str(users), "--concurrency", str(concurrency)],
+                            env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive the card routes against the local AniList stub.")
+    parser.add_argument("--sizes", default=",".join(map(str, LIST_SIZES)))
+    parser.add_argument("--users", type=int, default=25, help="distinct users per run; each user hits all four routes")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--skip-micro", action="store_true")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker is not None:
+        return worker(args.worker, args.users, args.concurrency)
+
+    print(f"{args.users} users x {len(ROUTES)} routes, concurrency {args.concurrency}, fresh process and asset cache per list size")
+    print(f"{'list size':>9} | {'run':<4} | {'req':>5} | {'err':>3} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | {'req/s':>7} | {'rss MB':>7} | {'graphql KB':>10} | {'images KB':>9} | {'served KB':>9}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        for phase, r in run_size(size, args.users, args.concurrency).items():
+            print(f"{size:>9} | {phase:<4} | {r['requests']:>5} | {r['errors']:>3} | {r['p50']:>8.2f} | {r['p95']:>8.2f} | {r['p99']:>8.2f} | {r['throughput']:>7.1f} | "
+                  f"{r['peak_rss_mb']:>7.1f} | {r['graphql_bytes'] / 1024:>10.1f} | {r['image_bytes'] / 1024:>9.1f} | {r['response_bytes'] / 1024:>9.1f}")
+
+    if not args.skip_micro:
+        os.environ.setdefault("ASSET_CACHE_DIR", tempfile.mkdtemp(prefix="bench_assets_"))
+        import bench_render
+        from anilist_stub import AniListStub
+        print()
+        with AniListStub(list_size=50) as stub:
+            bench_render.run(stub)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import ImageFont
+
+import app
+import text_layout
+from card_engine import compile_card
+
+ROUNDS = 200
+TITLES = [
+    "Frieren",
+    "Is It Wrong to Try to Pick Up Girls in a Dungeon? Familia Myth IV Part 2",
+    "Ore no Kanojo to Osananajimi ga Shuraba Sugiru: The Girl Who Kept Coming Back Every Single Morning to the Clubroom",
+    "Supercalifragilisticexpialidociousandevenlongerwordwithoutanyspacesatall",
+]
+layout_calls = 0
+_getbbox = ImageFont.FreeTypeFont.getbbox
+
+
+def counting_getbbox(self, *args, **kwargs):
+    global layout_calls
+    layout_calls += 1
+    return _getbbox(self, *args, **kwargs)
+
+
+def clear_caches():
+    for fn in (text_layout.text_bbox, text_layout.truncate_line, text_layout.wrap_lines):
+        fn.cache_clear()
+
+
+def layout_both_cards(title):
+    completed = app.CARD_SPECS["completed"]
+    text_layout.truncate_line(compile_card(app.CARD_SPECS["activity"])["fonts"]["title"], title, 200)
+    text_layout.wrap_lines(compile_card(completed)["fonts"]["title"], title, 220, completed["title_max_lines"], completed["line_spacing_details"] / 3)
+
+
+if __name__ == '__main__':
+    ImageFont.FreeTypeFont.getbbox = counting_getbbox
+    print(f"{'title length':>12} | {'cold layouts':>12} | {'cold us':>8} | {'warm layouts':>12} | {'warm us':>8}")
+    for title in TITLES:
+        cold, warm = [], []
+        for _ in range(ROUNDS):
+            clear_caches(); layout_calls = 0
+            start = time.perf_counter(); layout_both_cards(title); cold.append((time.perf_counter() - start) * 1e6)
+        cold_calls = layout_calls
+        layout_calls = 0
+        for _ in range(ROUNDS):
+            start = time.perf_counter(); layout_both_cards(title); warm.append((time.perf_counter() - start) * 1e6)
+        print(f"{len(title):>12} | {cold_calls:>12} | {statistics.median(cold):>8.1f} | {layout_calls // ROUNDS:>12} | {statistics.median(warm):>8.1f}")
@@ -0,0 +1,85 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    def __init__(self, max_entries=256, default_ttl=60, max_stale=3600, weigher=None):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.max_stale = max_stale
+        self.weigher = weigher
+        self.total_weight = 0
+        self.hits = self.stale_hits = self.misses = self.fallbacks = 0
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_weight = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, None
+            value, expires_at, _ = entry
+            now = time.monotonic()
+            self._entries.move_to_end(key)
+            if now - expires_at > self.max_stale:
+                return value, "expired"
+            return value, ("fresh" if now < expires_at else "stale")
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        weight = self.weigher(value) if self.weigher else 0
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.total_weight -= previous[2]
+            self._entries[key] = (value, time.monotonic() + ttl, weight)
+            self.total_weight += weight
+            while len(self._entries) > self.max_entries:
+                self.total_weight -= self._entries.popitem(last=False)[1][2]
+
+    def get_or_load(self, key, loader, ttl=None, revalidate=True):
+        value, state = self.get(key)
+        if state == "fresh":
+            self.hits += 1
+            return value
+        if state == "stale":
+            self.stale_hits += 1
+            if revalidate:
+                self._refresh_in_background(key, loader, ttl)
+            return value
+        self.misses += 1
+        loaded = loader()
+        if loaded is not None:
+            self.set(key, loaded, ttl)
+            return loaded
+        if state == "expired":
+            self.fallbacks += 1
+            return value
+        return None
+
+    def _refresh_in_background(self, key, loader, ttl):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                value = loader()
+                if value is not None:
+                    self.set(key, value, ttl)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
@@ -0,0 +1,258 @@
+import threading
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFilter
+
+from fonts import FONTS
+from metrics import METRICS
+from text_layout import text_bbox, text_height, text_width, truncate_line, wrap_lines
+
+DECODE_REDUCING_GAP = 2.0
+PLACEHOLDER_COLOR = (50, 50, 60, 200)
+_layouts = {}
+_layouts_lock = threading.Lock()
+
+
+@lru_cache(maxsize=32)
+def rounded_mask(size, rad):
+    mask = Image.new('L', size, 0); draw = ImageDraw.Draw(mask)
+    draw.rounded_rectangle((0, 0) + size, radius=rad, fill=255); return mask
+
+
+def add_rounded_corners(im, rad):
+    im.putalpha(rounded_mask(im.size, rad)); return im
+
+
+def aspect_crop_box(img_size, aspect_w, aspect_h):
+    img_w, img_h = img_size; target_aspect = aspect_w / aspect_h; img_aspect = img_w / img_h
+    if img_aspect > target_aspect: new_w = int(target_aspect * img_h); off = (img_w - new_w) // 2; return (off, 0, off + new_w, img_h)
+    elif img_aspect < target_aspect: new_h = int(img_w / target_aspect); off = (img_h - new_h) // 2; return (0, off, img_w, off + new_h)
+    return (0, 0, img_w, img_h)
+
+
+def crop_to_aspect(image, aspect_w, aspect_h):
+    box = aspect_crop_box(image.size, aspect_w, aspect_h)
+    return image if box == (0, 0) + image.size else image.crop(box)
+
+
+def decode_scaled(raw, size, box=None, gap=DECODE_REDUCING_GAP):
+    box = box or (0, 0) + raw.size
+    if raw.format == "JPEG":
+        scale = min((box[2] - box[0]) / size[0], (box[3] - box[1]) / size[1]) / gap
+        if scale > 1:
+            full_w, full_h = raw.size; raw.draft("RGB", (int(full_w / scale), int(full_h / scale)))
+            fx, fy = raw.size[0] / full_w, raw.size[1] / full_h; box = (box[0] * fx, box[1] * fy, box[2] * fx, box[3] * fy)
+    with METRICS.timer("decode"): raw.load(); img = raw if raw.mode == "RGB" else raw.convert("RGBA")
+    with METRICS.timer("resize"): return img.resize(size, Image.Resampling.LANCZOS, box=box, reducing_gap=gap).convert("RGBA")
+
+
+def draw_progress_bar(draw_ctx, x, y, w, h, prog_pct, bg_c, fill_c, rad):
+    prog_pct = max(0, min(1, prog_pct))
+    if bg_c is not None: draw_ctx.rounded_rectangle((x, y, x + w, y + h), radius=rad, fill=bg_c)
+    if prog_pct > 0: fill_w = w * prog_pct; draw_ctx.rounded_rectangle((x, y, x + fill_w, y + h), radius=rad, fill=fill_c) if fill_w >= 2 * rad else draw_ctx.rectangle((x, y, x + fill_w, y + h), fill=fill_c)
+
+
+def draw_centered(draw_ctx, size, text, font, fill):
+    bb = text_bbox(font, text); draw_ctx.text(((size[0] - (bb[2] - bb[0])) / 2, (size[1] - (bb[3] - bb[1])) / 2), text, font=font, fill=fill)
+
+
+def font_specs(spec, scale=1):
+    specs = [(name, size * scale, bold) for name, size, bold in spec["fonts"].values()]
+    return specs + (font_specs(spec["empty"], scale) if "empty" in spec else [])
+
+
+def _fonts(spec, scale):
+    return {role: FONTS.get(name, size * scale, bold) for role, (name, size, bold) in spec["fonts"].items()}
+
+
+def _scaled(size, scale):
+    return (size[0] * scale, size[1] * scale)
+
+
+def _cover_asset(url, size, rad):
+    return url, f"cover:v2:{size[0]}x{size[1]}:r{rad}", lambda raw: add_rounded_corners(decode_scaled(raw, size), rad)
+
+
+def _compile_activity(spec, s):
+    w, h = _scaled(spec["size"], s); pad, ov_pad = spec["padding"] * s, spec["scrim_padding"] * s; cover_size = _scaled(spec["cover_size"], s)
+    scrim_x0 = pad + cover_size[0] + pad - ov_pad; scrim_y0 = pad - ov_pad
+    scrim_w = w - scrim_x0 - pad + ov_pad; scrim_h = h - 2 * (pad - ov_pad)
+    scrim = Image.new('RGBA', (scrim_w + 1, scrim_h + 1), (0, 0, 0, 0))
+    ImageDraw.Draw(scrim).rounded_rectangle((0, 0, scrim_w, scrim_h), radius=spec["scrim_radius"] * s, fill=spec["scrim_color"])
+    fallback = Image.new('RGBA', (w, h), spec["background"] + (255,))
+    if spec.get("scrim_on_fallback", True): fallback.alpha_composite(scrim, dest=(scrim_x0, scrim_y0))
+    return {"size": (w, h), "fonts": _fonts(spec, s), "colors": spec["colors"], "empty_text": spec["empty_text"],
+            "cover_box": (pad, (h - cover_size[1]) // 2) + cover_size, "cover_radius": spec["cover_radius"] * s,
+            "scrim_box": (scrim_x0, scrim_y0, scrim_w, scrim_h), "scrim": scrim, "fallback": fallback,
+            "text_origin": (scrim_x0 + ov_pad, scrim_y0 + ov_pad), "title_width": scrim_w - 2 * ov_pad, "text_bottom": scrim_y0 + scrim_h - ov_pad,
+            "spacing": (spec["line_spacing_title"] * s, spec["line_spacing_details"] * s),
+            "banner_dim_color": spec["banner_dim"], "banner_dim": Image.new('RGBA', (w, h), spec["banner_dim"]), "banner_blur": spec["banner_blur"] * s}
+
+
+def _activity_assets(layout, data):
+    media_entry, _ = data; media = media_entry.get('media') if media_entry else None
+    if not media: return {}
+    (w, h), dim_c, blur_r = layout["size"], layout["banner_dim_color"], layout["banner_blur"]
+    def build_banner(raw):
+        banner = decode_scaled(raw, (w, h), aspect_crop_box(raw.size, w, h))
+        if dim_c[3] > 0: banner.alpha_composite(layout["banner_dim"])
+        if blur_r > 0: banner = banner.filter(ImageFilter.GaussianBlur(radius=blur_r))
+        return banner
+    banner_url, cover_url = media.get('bannerImage'), media.get('coverImage', {}).get('large')
+    assets = {"banner": (banner_url, f"banner:v2:{w}x{h}:dim{dim_c}:blur{blur_r}", build_banner)} if banner_url else {}
+    if cover_url: assets["cover"] = _cover_asset(cover_url, layout["cover_box"][2:], layout["cover_radius"])
+    return assets
+
+
+def _render_activity(layout, data, assets):
+    media_entry, media_type_for_log = data; colors = layout["colors"]; FNT_T, FNT_D = layout["fonts"]["title"], layout["fonts"]["details"]
+    media = media_entry.get('media') if media_entry else None; scrim_x0, scrim_y0, _, _ = layout["scrim_box"]
+    final_img = assets.get("banner")
+    if final_img is not None: final_img.alpha_composite(layout["scrim"], dest=(scrim_x0, scrim_y0))
+    else: final_img = layout["fallback"].copy()
+    draw = ImageDraw.Draw(final_img)
+    if not media:
+        draw_centered(draw, layout["size"], layout["empty_text"].format(media=media_type_for_log.lower()), FNT_T, colors["title"]); return final_img.convert("RGB")
+    cx, cy, cw, ch = layout["cover_box"]; cover_img = assets.get("cover")
+    if cover_img: final_img.paste(cover_img, (cx, cy), cover_img)
+    else: draw.rectangle((cx, cy, cx + cw, cy + ch), fill=PLACEHOLDER_COLOR)
+    title = media.get('title', {}).get('english') or media.get('title', {}).get('romaji') or "Untitled"; prog = str(media_entry.get('progress', 0))
+    prog_lbl = "Ep: " if media.get('type') == 'ANIME' else "Ch: "; fmt = f"Format: {media.get('format', 'N/A')}"
+    (txt_x, cur_y), (title_gap, details_gap) = layout["text_origin"], layout["spacing"]
+    cur_y = truncate_line(FNT_T, title, layout["title_width"]).draw(draw, txt_x, cur_y, colors["title"]) + title_gap
+    draw.text((txt_x, cur_y), prog_lbl, font=FNT_D, fill=colors["details"])
+    draw.text((txt_x + text_width(FNT_D, prog_lbl), cur_y), prog, font=FNT_D, fill=colors["accent"]); cur_y += text_height(FNT_D, prog_lbl + prog) + details_gap
+    if cur_y + text_height(FNT_D, fmt) <= layout["text_bottom"]: draw.text((txt_x, cur_y), fmt, font=FNT_D, fill=colors["details"])
+    return final_img.convert("RGB")
+
+
+def _compile_goal(spec, s):
+    (gw, gh), pad, fonts = _scaled(spec["size"], s), spec["padding"] * s, _fonts(spec, s)
+    blank = Image.new('RGB', (gw, gh), color=spec["background"])
+    base = blank.copy(); draw = ImageDraw.Draw(base)
+    bbT = text_bbox(fonts["title"], spec["title_text"]); title_y = pad
+    draw.text(((gw - (bbT[2] - bbT[0])) / 2, title_y), spec["title_text"], font=fonts["title"], fill=spec["colors"]["title"])
+    bar_y = title_y + (bbT[3] - bbT[1]) + pad / 2; bar_h, bar_rad = spec["bar_height"] * s, spec["bar_radius"] * s
+    draw.rounded_rectangle((pad, bar_y, gw - pad, bar_y + bar_h), radius=bar_rad, fill=spec["bar_color"])
+    return {"size": (gw, gh), "fonts": fonts, "colors": spec["colors"], "padding": pad, "blank": blank, "base": base,
+            "bar_box": (pad, bar_y, gw - 2 * pad, bar_h), "bar_radius": bar_rad, "bar_fill_color": spec["bar_fill_color"],
+            "goal_total": spec["goal_total"], "error_text": spec["error_text"]}
+
+
+def _render_goal(layout, completed, assets):
+    (w, h), pad, colors = layout["size"], layout["padding"], layout["colors"]; FNT_T, FNT_D = layout["fonts"]["title"], layout["fonts"]["details"]
+    if completed == -1:
+        img = layout["blank"].copy(); draw_centered(ImageDraw.Draw(img), (w, h), layout["error_text"], FNT_T, colors["title"]); return img
+    img = layout["base"].copy(); draw = ImageDraw.Draw(img); bar_x, bar_y, bar_w, bar_h = layout["bar_box"]; goal_total = layout["goal_total"]
+    prog_pct = completed / goal_total if goal_total > 0 else (1 if completed > 0 else 0)
+    draw_progress_bar(draw, bar_x, bar_y, bar_w, bar_h, prog_pct, None, layout["bar_fill_color"], layout["bar_radius"])
+    prog_txt = f"{completed} / {goal_total} Completed"
+    if completed >= goal_total and goal_total > 0: prog_txt = f"Goal Achieved! ({completed}/{goal_total})"
+    bbP = text_bbox(FNT_D, prog_txt); prog_x, prog_y = (w - (bbP[2] - bbP[0])) / 2, bar_y + bar_h + pad / 2
+    if prog_y + (bbP[3] - bbP[1]) > h - pad: prog_y = h - pad - (bbP[3] - bbP[1])
+    draw.text((prog_x, prog_y), prog_txt, font=FNT_D, fill=colors["details"])
+    return img
+
+
+def _compile_completed(spec, s):
+    (w, h), pad, cover_size = _scaled(spec["size"], s), spec["padding"] * s, _scaled(spec["cover_size"], s)
+    return {"size": (w, h), "fonts": _fonts(spec, s), "colors": spec["colors"], "padding": pad, "score_gap": 3 * s,
+            "base": Image.new('RGBA', (w, h), spec["background"] + (255,)), "cover_box": (pad, (h - cover_size[1]) // 2) + cover_size,
+            "cover_radius": spec["cover_radius"] * s, "title_gap": spec["line_spacing_title"] * s, "title_line_spacing": spec["line_spacing_details"] * s / 3,
+            "title_max_lines": spec["title_max_lines"], "subtitle_text": spec["subtitle_text"], "empty_text": spec["empty_text"]}
+
+
+def _completed_assets(layout, completed_entry):
+    cover_url = (((completed_entry or {}).get('media') or {}).get('coverImage') or {}).get('large')
+    return {"cover": _cover_asset(cover_url, layout["cover_box"][2:], layout["cover_radius"])} if cover_url else {}
+
+
+def _render_completed(layout, completed_entry, assets):
+    (w, h), padding, colors, fonts = layout["size"], layout["padding"], layout["colors"], layout["fonts"]
+    FNT_T, FNT_SUB, FNT_SV, FNT_SS = fonts["title"], fonts["subtitle"], fonts["score_value"], fonts["score_suffix"]
+    final_img = layout["base"].copy(); draw = ImageDraw.Draw(final_img)
+    if not completed_entry or not completed_entry.get('media'):
+        draw_centered(draw, (w, h), layout["empty_text"], FNT_T, colors["title"]); return final_img.convert("RGB")
+    media = completed_entry['media']; title_full = media.get('title', {}).get('english') or media.get('title', {}).get('romaji') or "Untitled"
+    score_raw = completed_entry.get('score', 0); score_disp_val = f"{score_raw}" if score_raw > 0 else "N/S"
+    cx, cy, cw, ch = layout["cover_box"]; cover_img = assets.get("cover")
+    if cover_img: final_img.paste(cover_img, (cx, cy), cover_img)
+    else: draw.rectangle((cx, cy, cx + cw, cy + ch), fill=PLACEHOLDER_COLOR)
+    sval_bb = text_bbox(FNT_SV, score_disp_val); sval_w, sval_h = sval_bb[2] - sval_bb[0], sval_bb[3] - sval_bb[1]
+    sval_ascent, _ = FNT_SV.getmetrics(); ssuf_w = 0
+    if score_raw > 0: ssuf_bb = text_bbox(FNT_SS, " /100"); ssuf_w = ssuf_bb[2] - ssuf_bb[0]; ssuf_ascent, _ = FNT_SS.getmetrics()
+    score_x_start = w - padding - (sval_w + (ssuf_w + layout["score_gap"] if score_raw > 0 else 0)); score_block_center_y = h / 2
+    draw.text((score_x_start, score_block_center_y - sval_ascent + (sval_ascent - sval_h) / 2), score_disp_val, font=FNT_SV, fill=colors["score_value"])
+    if score_raw > 0:
+        score_suf_y = score_block_center_y - ssuf_ascent + (ssuf_ascent - (ssuf_bb[3] - ssuf_bb[1])) / 2
+        draw.text((score_x_start + sval_w + layout["score_gap"], score_suf_y), " /100", font=FNT_SS, fill=colors["score_suffix"])
+    text_area_x_start = cx + cw + padding
+    title_lines = wrap_lines(FNT_T, title_full, score_x_start - text_area_x_start - padding, layout["title_max_lines"], layout["title_line_spacing"])
+    subtitle_height = text_height(FNT_SUB, layout["subtitle_text"]); title_gap = layout["title_gap"] if title_lines else 0
+    block_y_start = max(padding, (h - (title_lines.height + title_gap + subtitle_height)) / 2)
+    subtitle_y = title_lines.draw(draw, text_area_x_start, block_y_start, colors["title"]) + title_gap
+    if subtitle_y + subtitle_height > h - padding: subtitle_y = h - padding - subtitle_height
+    draw.text((text_area_x_start, subtitle_y), layout["subtitle_text"], font=FNT_SUB, fill=colors["subtitle"])
+    return final_img.convert("RGB")
+
+
+@lru_cache(maxsize=256)
+def score_badge(font, pad, fill, text_fill, text):
+    bb = text_bbox(font, text); badge = Image.new('RGBA', (bb[2] - bb[0] + 2 * pad, bb[3] - bb[1] + 2 * pad), (0, 0, 0, 0)); draw = ImageDraw.Draw(badge)
+    draw.rounded_rectangle((0, 0, badge.width - 1, badge.height - 1), radius=pad, fill=fill)
+    draw.text((pad - bb[0], pad - bb[1]), text, font=font, fill=text_fill); return badge
+
+
+def _compile_grid(spec, s):
+    fonts = _fonts(spec, s); pad, gap = spec["padding"] * s, spec["gap"] * s; bbH = text_bbox(fonts["header"], spec["header_text"])
+    return {"fonts": fonts, "colors": spec["colors"], "padding": pad, "gap": gap, "columns": spec["columns"], "background": spec["background"] + (255,),
+            "cover_size": _scaled(spec["cover_size"], s), "cover_radius": spec["cover_radius"] * s, "header_text": spec["header_text"], "header_offset": pad - bbH[1],
+            "top": pad + (bbH[3] - bbH[1]) + gap, "badge": (spec["badge_padding"] * s, spec["badge_color"], spec["colors"]["score"]), "badge_inset": 4 * s,
+            "empty": spec["empty"], "scale": s}
+
+
+def _grid_assets(layout, data):
+    urls = [(((entry or {}).get('media') or {}).get('coverImage') or {}).get('large') for entry in data[0] or []]
+    return {f"cover{i}": _cover_asset(url, layout["cover_size"], layout["cover_radius"]) for i, url in enumerate(urls) if url}
+
+
+def _render_grid(layout, data, assets):
+    entries, columns = data
+    if not entries: return render_card(layout["empty"], None, {}, layout["scale"])
+    size, pad, gap, top = layout["cover_size"], layout["padding"], layout["gap"], layout["top"]
+    cols = max(1, min(columns or layout["columns"], len(entries))); rows = -(-len(entries) // cols)
+    final_img = Image.new('RGBA', (2 * pad + cols * size[0] + (cols - 1) * gap, top + rows * size[1] + (rows - 1) * gap + pad), layout["background"])
+    draw = ImageDraw.Draw(final_img); draw.text((pad, layout["header_offset"]), layout["header_text"], font=layout["fonts"]["header"], fill=layout["colors"]["header"])
+    inset = layout["badge_inset"]
+    for i, entry in enumerate(entries):
+        x, y = pad + (i % cols) * (size[0] + gap), top + (i // cols) * (size[1] + gap); cover_img = assets.get(f"cover{i}")
+        if cover_img: final_img.paste(cover_img, (x, y), cover_img)
+        else: draw.rectangle((x, y, x + size[0], y + size[1]), fill=PLACEHOLDER_COLOR)
+        score = entry.get('score') or 0; badge = score_badge(layout["fonts"]["score"], *layout["badge"], str(score) if score > 0 else "N/S")
+        final_img.alpha_composite(badge, dest=(x + size[0] - badge.width - inset, y + size[1] - badge.height - inset))
+    return final_img.convert("RGB")
+
+
+CARD_KINDS = {
+    "activity": (_compile_activity, _activity_assets, _render_activity),
+    "goal": (_compile_goal, lambda layout, data: {}, _render_goal),
+    "completed": (_compile_completed, _completed_assets, _render_completed),
+    "grid": (_compile_grid, _grid_assets, _render_grid),
+}
+
+
+def compile_card(spec, scale=1):
+    key = (id(spec), scale); cached = _layouts.get(key)
+    if cached is None:
+        with _layouts_lock:
+            cached = _layouts.get(key)
+            if cached is None: cached = _layouts[key] = (spec, CARD_KINDS[spec["kind"]][0](spec, scale))
+    return cached[1]
+
+
+def card_assets(spec, data, scale=1):
+    return CARD_KINDS[spec["kind"]][1](compile_card(spec, scale), data)
+
+
+def render_card(spec, data, assets=None, scale=1):
+    return CARD_KINDS[spec["kind"]][2](compile_card(spec, scale), data, assets or {})
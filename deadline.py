@@ -0,0 +1,22 @@
+import contextvars
+import time
+
+_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+
+def start(budget_s):
+    return _deadline.set(time.monotonic() + budget_s if budget_s and budget_s > 0 else None)
+
+
+def reset(token):
+    _deadline.reset(token)
+
+
+def remaining():
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def budget(default, share=1.0):
+    left = remaining()
+    return default if left is None else min(default, max(0.0, left * share))
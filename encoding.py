@@ -0,0 +1,38 @@
+import os
+from io import BytesIO
+from PIL import Image, features
+
+MIMETYPES = {"png": "image/png", "webp": "image/webp", "avif": "image/avif"}
+AVAILABLE_FORMATS = {"png"} | {fmt for fmt in ("webp", "avif") if features.check(fmt)}
+
+ENCODE_CONFIG = {
+    "png_compress_level": int(os.getenv("PNG_COMPRESS_LEVEL", 6)),
+    "png_palette_colors": int(os.getenv("PNG_PALETTE_COLORS", 256)),
+    "webp_quality": int(os.getenv("WEBP_QUALITY", 80)),
+    "webp_method": int(os.getenv("WEBP_METHOD", 4)),
+    "avif_quality": int(os.getenv("AVIF_QUALITY", 60)),
+    "avif_speed": int(os.getenv("AVIF_SPEED", 8)),
+}
+
+
+def encode_image(image, fmt, palette=False, lossless=False, config=ENCODE_CONFIG):
+    if fmt not in AVAILABLE_FORMATS: raise ValueError(f"Unsupported image format: {fmt}")
+    buf = BytesIO()
+    if fmt == "png":
+        if palette: image = image.quantize(config["png_palette_colors"], method=Image.Quantize.FASTOCTREE)
+        image.save(buf, "PNG", compress_level=config["png_compress_level"], optimize=False)
+    elif fmt == "webp":
+        image.save(buf, "WEBP", quality=100 if lossless else config["webp_quality"], lossless=lossless, method=config["webp_method"])
+    else:
+        image.save(buf, "AVIF", quality=config["avif_quality"], speed=config["avif_speed"])
+    return buf.getvalue()
+
+
+def negotiate_format(accept, preferences, requested=None):
+    if requested:
+        requested = requested.lower()
+        return requested if requested in AVAILABLE_FORMATS else None
+    accepted = {value for value, quality in accept if quality > 0}
+    for fmt in preferences:
+        if fmt in AVAILABLE_FORMATS and (fmt == "png" or MIMETYPES[fmt] in accepted): return fmt
+    return "png"
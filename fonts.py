@@ -0,0 +1,52 @@
+import os
+import threading
+
+from PIL import ImageFont
+
+FONT_DIR = os.path.dirname(os.path.abspath(__file__))
+FALLBACK_FONTS = {True: ["arialbd.ttf", "DejaVuSans-Bold.ttf"], False: ["arial.ttf", "DejaVuSans.ttf"]}
+
+
+class FontRegistry:
+    def __init__(self, font_dir=FONT_DIR):
+        self.font_dir = font_dir
+        self.missing = set()
+        self._fonts = {}
+        self._lock = threading.Lock()
+
+    def get(self, name, size, bold=False):
+        key = (name, size, bold)
+        font = self._fonts.get(key)
+        if font is None:
+            with self._lock:
+                font = self._fonts.get(key)
+                if font is None:
+                    font = self._fonts[key] = self._load(name, size, bold)
+        return font
+
+    def _load(self, name, size, bold):
+        local_path = os.path.join(self.font_dir, name)
+        for candidate in [local_path if os.path.exists(local_path) else name] + FALLBACK_FONTS[bold]:
+            try:
+                return ImageFont.truetype(candidate, size)
+            except OSError:
+                if candidate in (name, local_path):
+                    self.missing.add(name)
+        try:
+            return ImageFont.load_default(size)
+        except TypeError:
+            return ImageFont.load_default()
+
+    def warm_up(self, specs, background=True):
+        def load_all():
+            for name, size, bold in specs:
+                self.get(name, size, bold)
+        if not background:
+            load_all()
+            return None
+        thread = threading.Thread(target=load_all, name="font-warmup", daemon=True)
+        thread.start()
+        return thread
+
+
+FONTS = FontRegistry()
@@ -1,104 +1,75 @@
 import os
+import sys
+import json
+import hashlib
+import argparse
+import tempfile
 import requests
-from PIL import Image, ImageDraw, ImageFont, ImageFilter
+from PIL import Image
 from io import BytesIO
 from dotenv import load_dotenv
 import time
 import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http_client import http_get, http_post
+from fonts import FONTS
+from card_engine import card_assets, render_card
 
 load_dotenv()
 
 ANILIST_USERNAME = os.getenv("ANILIST_USERNAME")
 ANILIST_TOKEN = os.getenv("ANILIST_TOKEN")
-ANILIST_API_URL = 'https://graphql.anilist.co'
+ANILIST_API_URL = os.getenv("ANILIST_API_URL", 'https://graphql.anilist.co')
 
-STYLE_CONFIG = {
-    "image_width": 450,
-    "image_height": 125,
-    "fallback_background_color": (30, 33, 38),
-    "text_color_title": (240, 240, 245),
-    "text_color_details": (200, 205, 215),
-    "accent_color": (100, 190, 255),
-    "cover_image_size": (80, 115),
-    "cover_corner_radius": 6,
+REQUEST_TIMEOUT = 20
+CARD_SPEC = {
+    "kind": "activity",
+    "size": (450, 125),
     "padding": 15,
-    "font_title_name": "Montserrat-Bold.ttf",
-    "font_details_name": "OpenSans-Regular.ttf",
-    "font_size_title": 22,
-    "font_size_details": 15,
-    "text_overlay_color": (20, 22, 25, 200),
-    "text_overlay_padding": 10,
-    "text_overlay_corner_radius": 5,
-    "line_spacing_title_details": 7,
+    "background": (30, 33, 38),
+    "cover_size": (80, 115),
+    "cover_radius": 6,
+    "scrim_color": (20, 22, 25, 200),
+    "scrim_padding": 10,
+    "scrim_radius": 5,
+    "scrim_on_fallback": False,
+    "banner_dim": (0, 0, 0, 0),
+    "banner_blur": 0,
+    "fonts": {"title": ("Montserrat-Bold.ttf", 22, True), "details": ("OpenSans-Regular.ttf", 15, False)},
+    "colors": {"title": (240, 240, 245), "details": (200, 205, 215), "accent": (100, 190, 255)},
+    "line_spacing_title": 7,
     "line_spacing_details": 5,
-    "request_timeout": 20
+    "empty_text": "No recent {media} activity.",
 }
+STYLE_FINGERPRINT = hashlib.sha256(json.dumps(CARD_SPEC, sort_keys=True).encode()).hexdigest()[:16]
+BATCH_STATE_FILE = os.getenv("BATCH_STATE_FILE", ".card_state.json")
 
-try:
-    FONT_TITLE = ImageFont.truetype(STYLE_CONFIG["font_title_name"], STYLE_CONFIG["font_size_title"])
-    FONT_DETAILS = ImageFont.truetype(STYLE_CONFIG["font_details_name"], STYLE_CONFIG["font_size_details"])
-    print(f"Custom fonts ('{STYLE_CONFIG['font_title_name']}', '{STYLE_CONFIG['font_details_name']}') loaded successfully for script.")
-except IOError:
-    print(f"!!! SCRIPT: CUSTOM FONTS NOT FOUND. Using default PIL font. Place '{STYLE_CONFIG['font_title_name']}' and '{STYLE_CONFIG['font_details_name']}' in the script directory. !!!")
-    try:
-        FONT_TITLE = ImageFont.truetype(None, STYLE_CONFIG["font_size_title"])
-        FONT_DETAILS = ImageFont.truetype(None, STYLE_CONFIG["font_size_details"])
-        print("SCRIPT: Default PIL fonts loaded as fallback.")
-    except IOError:
-        print("!!! SCRIPT: Default PIL fonts ALSO NOT FOUND. Text rendering might fail or look incorrect. !!!")
-        FONT_TITLE = ImageFont.load_default()
-        FONT_DETAILS = ImageFont.load_default()
-
-
-def add_rounded_corners(im, rad):
-    mask = Image.new('L', im.size, 0)
-    draw = ImageDraw.Draw(mask)
-    draw.rounded_rectangle((0, 0) + im.size, radius=rad, fill=255)
-    im.putalpha(mask)
-    return im
-
-def crop_to_aspect(image, aspect_w, aspect_h):
-    img_w, img_h = image.size
-    target_aspect = aspect_w / aspect_h
-    img_aspect = img_w / img_h
-    if img_aspect > target_aspect:
-        new_w = int(target_aspect * img_h)
-        offset = (img_w - new_w) // 2
-        image = image.crop((offset, 0, offset + new_w, img_h))
-    elif img_aspect < target_aspect:
-        new_h = int(img_w / target_aspect)
-        offset = (img_h - new_h) // 2
-        image = image.crop((0, offset, img_w, offset + new_h))
-    return image
-
-def get_last_updated_media(media_type="ANIME"):
+def get_last_updated_media(media_type="ANIME", username=None):
+    username = username or ANILIST_USERNAME
     print(f"\n[{time.strftime('%H:%M:%S')}] [get_last_updated_media - {media_type}] Function called.")
     query = '''
     query ($userName: String, $type: MediaType, $sort: [MediaListSort]) {
-        MediaListCollection(userName: $userName, type: $type, sort: $sort, forceSingleCompletedList: true) {
-            lists {
-                name
-                entries {
-                    updatedAt
-                    progress
-                    media {
-                        id
-                        title { romaji english }
-                        coverImage { large }
-                        bannerImage
-                        type format
-                    }
+        Page(page: 1, perPage: 1) {
+            mediaList(userName: $userName, type: $type, sort: $sort) {
+                updatedAt
+                progress
+                media {
+                    id
+                    title { romaji english }
+                    coverImage { large }
+                    bannerImage
+                    type format
                 }
             }
         }
     }
     '''
-    variables = {'userName': ANILIST_USERNAME, 'type': media_type, 'sort': 'UPDATED_TIME_DESC'}
+    variables = {'userName': username, 'type': media_type, 'sort': 'UPDATED_TIME_DESC'}
     headers = {'Authorization': f'Bearer {ANILIST_TOKEN}', 'Content-Type': 'application/json', 'Accept': 'application/json'}
 
-    print(f"[{time.strftime('%H:%M:%S')}] [get_last_updated_media - {media_type}] Attempting to fetch data for {ANILIST_USERNAME}...")
+    print(f"[{time.strftime('%H:%M:%S')}] [get_last_updated_media - {media_type}] Attempting to fetch data for {username}...")
     try:
-        response = requests.post(ANILIST_API_URL, json={'query': query, 'variables': variables}, headers=headers, timeout=STYLE_CONFIG["request_timeout"])
+        response = http_post(ANILIST_API_URL, json={'query': query, 'variables': variables}, headers=headers, timeout=REQUEST_TIMEOUT)
         print(f"[{time.strftime('%H:%M:%S')}] [get_last_updated_media - {media_type}] Anilist API response status: {response.status_code}")
         content_type = response.headers.get('Content-Type', '')
         if 'application/json' not in content_type:
@@ -118,155 +89,149 @@ def get_last_updated_media(media_type="ANIME"):
         print(f"[{time.strftime('%H:%M:%S')}] [get_last_updated_media - {media_type}] !!! General Exception during API/JSON: {e}")
         return None
 
-    all_entries = []
-    if data.get('data') and data['data'].get('MediaListCollection') and data['data']['MediaListCollection'].get('lists'):
-        for media_list in data['data']['MediaListCollection']['lists']:
-            if media_list and media_list.get('entries'):
-                 all_entries.extend(media_list['entries'])
-        print(f"[{time.strftime('%H:%M:%S')}] [get_last_updated_media - {media_type}] Processed {len(all_entries)} potential entries.")
-    else:
-        print(f"[{time.strftime('%H:%M:%S')}] [get_last_updated_media - {media_type}] Anilist API response structure not as expected or no lists. Data: {str(data)[:200]}")
+    page = (data.get('data') or {}).get('Page') or {}
+    entries = page.get('mediaList')
+    if entries is None:
+        print(f"[{time.strftime('%H:%M:%S')}] [get_last_updated_media - {media_type}] Anilist API response structure not as expected. Data: {str(data)[:200]}")
         return None
 
-    if not all_entries:
+    if not entries:
         print(f"[{time.strftime('%H:%M:%S')}] [get_last_updated_media - {media_type}] No entries found.")
         return None
     
-    all_entries.sort(key=lambda x: x.get('updatedAt', 0), reverse=True)
-    selected_entry = all_entries[0]
+    selected_entry = entries[0]
     
     if selected_entry.get('media') and selected_entry['media'].get('title'):
         print(f"[{time.strftime('%H:%M:%S')}] [get_last_updated_media - {media_type}] Most recent: {selected_entry['media']['title'].get('romaji', 'N/A')}")
     return selected_entry
 
 
-def generate_image(media_entry, media_type_for_log="MEDIA"):
-    cfg = STYLE_CONFIG
-    print(f"\n[{time.strftime('%H:%M:%S')}] [generate_image - {media_type_for_log}] Function called.")
-    
-    base_image = None
-    media = media_entry.get('media') if media_entry else None
-    banner_url = media.get('bannerImage') if media else None
-
-    if banner_url:
-        print(f"[{time.strftime('%H:%M:%S')}] [generate_image - {media_type_for_log}] Attempting to download banner: {banner_url}")
+def download_assets(assets, media_type_for_log="MEDIA"):
+    images = {}
+    for name, (url, _, prepare) in assets.items():
+        print(f"[{time.strftime('%H:%M:%S')}] [generate_image - {media_type_for_log}] Attempting to download {name}: {url}")
         try:
-            banner_response = requests.get(banner_url, stream=True, timeout=cfg["request_timeout"])
-            banner_response.raise_for_status()
-            banner_img_data = BytesIO(banner_response.content)
-            banner_image_raw = Image.open(banner_img_data).convert("RGBA")
-            cropped_banner = crop_to_aspect(banner_image_raw, cfg["image_width"], cfg["image_height"])
-            base_image = cropped_banner.resize((cfg["image_width"], cfg["image_height"]), Image.Resampling.LANCZOS)
-            print(f"[{time.strftime('%H:%M:%S')}] [generate_image - {media_type_for_log}] Banner image processed.")
+            response = http_get(url, stream=True, timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+            images[name] = prepare(Image.open(BytesIO(response.content)))
         except Exception as e:
-            print(f"[{time.strftime('%H:%M:%S')}] [generate_image - {media_type_for_log}] !!! Error with banner: {e}. Falling back.")
-            base_image = None
-    if base_image is None:
-        base_image = Image.new('RGBA', (cfg["image_width"], cfg["image_height"]), color=cfg["fallback_background_color"] + (255,))
-    
-    final_image = base_image.convert("RGBA")
-    draw = ImageDraw.Draw(final_image)
-    
-    overlay_x0 = cfg["padding"]
-    overlay_y0 = cfg["padding"]
-    overlay_x1 = cfg["image_width"] - cfg["padding"]
-    overlay_y1 = cfg["image_height"] - cfg["padding"]
-    
-    text_area_overlay_img = Image.new('RGBA', final_image.size, (0,0,0,0))
-    draw_text_overlay = ImageDraw.Draw(text_area_overlay_img)
-    
-    text_scrim_x0 = cfg["padding"] + cfg["cover_image_size"][0] + cfg["padding"]
-    text_scrim_y0 = cfg["padding"]
-    text_scrim_width = cfg["image_width"] - text_scrim_x0 - cfg["padding"]
-    text_scrim_height = cfg["image_height"] - 2 * cfg["padding"]
-    
-    if banner_url:
-        draw_text_overlay.rounded_rectangle(
-            (text_scrim_x0 - cfg["text_overlay_padding"], text_scrim_y0 - cfg["text_overlay_padding"], 
-             text_scrim_x0 + text_scrim_width + cfg["text_overlay_padding"], text_scrim_y0 + text_scrim_height + cfg["text_overlay_padding"]),
-            radius=cfg["text_overlay_corner_radius"],
-            fill=cfg["text_overlay_color"]
-        )
-        final_image = Image.alpha_composite(final_image, text_area_overlay_img)
-        draw = ImageDraw.Draw(final_image)
+            print(f"[{time.strftime('%H:%M:%S')}] [generate_image - {media_type_for_log}] !!! Error with {name}: {e}. Falling back.")
+    return images
 
-    if not media:
-        error_text = f"No recent {media_type_for_log.lower()} activity."
-        text_bbox = draw.textbbox((0,0), error_text, font=FONT_TITLE)
-        text_width = text_bbox[2] - text_bbox[0]
-        text_height = text_bbox[3] - text_bbox[1]
-        draw.text(
-            ((cfg["image_width"] - text_width) / 2, (cfg["image_height"] - text_height) / 2),
-            error_text, font=FONT_TITLE, fill=cfg["text_color_title"]
-        )
-        return final_image
+def generate_image(media_entry, media_type_for_log="MEDIA", scale=1):
+    print(f"\n[{time.strftime('%H:%M:%S')}] [generate_image - {media_type_for_log}] Function called.")
+    data = (media_entry, media_type_for_log)
+    image = render_card(CARD_SPEC, data, download_assets(card_assets(CARD_SPEC, data, scale), media_type_for_log), scale)
+    print(f"[{time.strftime('%H:%M:%S')}] [generate_image - {media_type_for_log}] Image generation complete.")
+    return image
 
-    cover_url = media.get('coverImage', {}).get('large')
-    cover_x = cfg["padding"] + cfg["text_overlay_padding"]
-    cover_y = (cfg["image_height"] - cfg["cover_image_size"][1]) // 2
-    if cover_url:
-        try:
-            cover_response = requests.get(cover_url, stream=True, timeout=cfg["request_timeout"])
-            cover_response.raise_for_status()
-            cover_img_data = BytesIO(cover_response.content)
-            cover_img = Image.open(cover_img_data).convert("RGBA")
-            cover_img = cover_img.resize(cfg["cover_image_size"], Image.Resampling.LANCZOS)
-            cover_img = add_rounded_corners(cover_img, cfg["cover_corner_radius"])
-            final_image.paste(cover_img, (cover_x, cover_y), cover_img)
-        except Exception as e:
-            print(f"[{time.strftime('%H:%M:%S')}] [generate_image - {media_type_for_log}] !!! Error with cover: {e}")
-            draw.rectangle((cover_x, cover_y, cover_x + cfg["cover_image_size"][0], cover_y + cfg["cover_image_size"][1]), fill=(50,50,60,200))
-    else:
-        draw.rectangle((cover_x, cover_y, cover_x + cfg["cover_image_size"][0], cover_y + cfg["cover_image_size"][1]), fill=(50,50,60,200))
+def card_filename(media_type, scale=1):
+    return f"last_{media_type.lower()}{'' if scale == 1 else f'@{scale}x'}.png"
 
-    title_obj = media.get('title', {})
-    title = title_obj.get('english') or title_obj.get('romaji') or "Untitled"
-    progress = media_entry.get('progress', 0)
-    progress_text_val = str(progress)
-    progress_label = "Ep: " if media.get('type') == 'ANIME' else "Ch: "
-    media_format_text = f"Format: {media.get('format', 'N/A')}"
-    
-    text_x_start = text_scrim_x0 
-    current_y = text_scrim_y0 + cfg["text_overlay_padding"]
+def file_mode(path):
+    try: return os.stat(path).st_mode & 0o777
+    except OSError:
+        umask = os.umask(0); os.umask(umask)
+        return 0o666 & ~umask
 
-    display_title = title
-    max_text_width_for_title = text_scrim_width - (2 * cfg["text_overlay_padding"])
-    title_bbox = draw.textbbox((0,0), display_title, font=FONT_TITLE)
-    title_width = title_bbox[2] - title_bbox[0]
-    while title_width > max_text_width_for_title and len(display_title) > 15:
-        display_title = display_title[:-4] + "..."
-        title_bbox = draw.textbbox((0,0), display_title, font=FONT_TITLE)
-        title_width = title_bbox[2] - title_bbox[0]
-    draw.text((text_x_start, current_y), display_title, font=FONT_TITLE, fill=cfg["text_color_title"])
-    current_y += (title_bbox[3] - title_bbox[1]) + cfg["line_spacing_title_details"]
+def write_atomic(path, data):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_")
+    try:
+        with os.fdopen(fd, 'wb') as f: f.write(data)
+        os.chmod(tmp_path, file_mode(path)); os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path); raise
 
-    draw.text((text_x_start, current_y), progress_label, font=FONT_DETAILS, fill=cfg["text_color_details"])
-    label_bbox = draw.textbbox((0,0), progress_label, font=FONT_DETAILS)
-    label_width = label_bbox[2] - label_bbox[0]
-    draw.text((text_x_start + label_width, current_y), progress_text_val, font=FONT_DETAILS, fill=cfg["accent_color"])
-    progress_full_bbox = draw.textbbox((0,0), progress_label + progress_text_val, font=FONT_DETAILS)
-    current_y += (progress_full_bbox[3] - progress_full_bbox[1]) + cfg["line_spacing_details"]
+def card_state(media_entry):
+    media = (media_entry or {}).get('media') or {}
+    return {"updatedAt": (media_entry or {}).get('updatedAt'), "progress": (media_entry or {}).get('progress'), "media_id": media.get('id'), "style": STYLE_FINGERPRINT}
 
-    draw.text((text_x_start, current_y), media_format_text, font=FONT_DETAILS, fill=cfg["text_color_details"])
-    
-    print(f"[{time.strftime('%H:%M:%S')}] [generate_image - {media_type_for_log}] Image generation complete.")
-    return final_image
+def load_state(path):
+    try:
+        with open(path) as f: return json.load(f).get("cards", {})
+    except (OSError, ValueError):
+        return {}
+
+def render_card_to_file(media_entry, media_type, output_path, scale=1):
+    img_io = BytesIO()
+    generate_image(media_entry, media_type_for_log=media_type, scale=scale).save(img_io, 'PNG')
+    data = img_io.getvalue()
+    if os.path.exists(output_path):
+        with open(output_path, 'rb') as f:
+            if f.read() == data: return False, sorted(FONTS.missing)
+    write_atomic(output_path, data)
+    return True, sorted(FONTS.missing)
+
+def run_batch(users, media_types, out_dir=".", state_path=BATCH_STATE_FILE, workers=None, force=False, scale=1):
+    print(f"[{time.strftime('%H:%M:%S')}] [batch] {len(users)} user(s) x {len(media_types)} card(s), state file '{state_path}'.")
+    state = load_state(state_path)
+    cards = [(user, media_type, os.path.join(out_dir, user if len(users) > 1 else "", card_filename(media_type, scale))) for user in users for media_type in media_types]
+    with ThreadPoolExecutor(max_workers=min(8, len(cards)) or 1) as pool:
+        entries = list(pool.map(lambda card: get_last_updated_media(card[1], card[0]), cards))
+    pending, new_state = [], dict(state)
+    for (user, media_type, output_path), entry in zip(cards, entries):
+        key = f"{user.lower()}/{media_type}" + ("" if scale == 1 else f"@{scale}x")
+        if entry is None and os.path.exists(output_path):
+            print(f"[{time.strftime('%H:%M:%S')}] [batch] {key}: no data, keeping existing '{output_path}'.")
+            continue
+        current = card_state(entry)
+        if not force and state.get(key) == current and os.path.exists(output_path):
+            print(f"[{time.strftime('%H:%M:%S')}] [batch] {key}: unchanged, skipped.")
+            continue
+        pending.append((key, entry, media_type, output_path)); new_state[key] = current
+    written, missing_fonts = 0, set()
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            futures = [(key, output_path, pool.submit(render_card_to_file, entry, media_type, output_path, scale)) for key, entry, media_type, output_path in pending]
+            for key, output_path, future in futures:
+                try:
+                    changed, missing = future.result(); written += changed; missing_fonts.update(missing)
+                    print(f"[{time.strftime('%H:%M:%S')}] [batch] {key}: {'wrote' if changed else 'rendered identical'} '{output_path}'.")
+                except Exception as e:
+                    if key in state: new_state[key] = state[key]
+                    else: del new_state[key]
+                    print(f"[{time.strftime('%H:%M:%S')}] [batch] !!! {key}: render failed: {e}")
+    write_atomic(state_path, json.dumps({"version": 1, "cards": new_state}, indent=2, sort_keys=True).encode())
+    print(f"[{time.strftime('%H:%M:%S')}] [batch] {len(cards)} card(s): {len(pending)} rendered, {written} file(s) written, {len(cards) - len(pending)} skipped.")
+    if missing_fonts:
+        print(f"!!! SCRIPT: CUSTOM FONTS NOT FOUND: {', '.join(sorted(missing_fonts))}. Fallback fonts were used. Place them in the script directory. !!!")
+    return written
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate AniList activity cards.")
+    parser.add_argument("--batch", action="store_true", help="only re-render cards whose AniList data changed since the last run")
+    parser.add_argument("--users", default=ANILIST_USERNAME, help="comma-separated AniList usernames (default: ANILIST_USERNAME)")
+    parser.add_argument("--cards", default="ANIME,MANGA", help="comma-separated media types to render")
+    parser.add_argument("--out-dir", default=".", help="output directory; one subdirectory per user when several users are given")
+    parser.add_argument("--state", default=BATCH_STATE_FILE, help="state file used for change detection")
+    parser.add_argument("--workers", type=int, default=None, help="render processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="re-render every card regardless of state")
+    parser.add_argument("--scale", type=int, choices=[1, 2, 3], default=1, help="pixel density multiplier for HiDPI output")
+    return parser.parse_args(argv)
 
 if __name__ == '__main__':
+    args = parse_args()
     print(f"[{time.strftime('%H:%M:%S')}] Static image generation script started.")
 
-    if not ANILIST_USERNAME:
+    if not ANILIST_USERNAME and not (args.batch and args.users):
         print("CRITICAL ERROR: ANILIST_USERNAME not set as environment variable.")
         exit(1)
     if not ANILIST_TOKEN:
         print("CRITICAL ERROR: ANILIST_TOKEN not set as environment variable.")
         exit(1)
+
+    if args.batch:
+        users = [u.strip() for u in (args.users or "").split(",") if u.strip()]
+        run_batch(users, [t.strip().upper() for t in args.cards.split(",") if t.strip()], args.out_dir, args.state, args.workers, args.force, args.scale)
+        sys.exit(0)
     
     print(f"\n[{time.strftime('%H:%M:%S')}] Attempting to generate Anime image...")
     try:
         latest_anime = get_last_updated_media(media_type="ANIME")
-        anime_img = generate_image(latest_anime, media_type_for_log="ANIME")
-        output_anime_filename = "last_anime.png"
+        anime_img = generate_image(latest_anime, media_type_for_log="ANIME", scale=args.scale)
+        output_anime_filename = card_filename("ANIME", args.scale)
         anime_img.save(output_anime_filename, 'PNG')
         print(f"[{time.strftime('%H:%M:%S')}] Anime image saved as '{output_anime_filename}'")
     except Exception as e:
@@ -276,12 +241,14 @@ if __name__ == '__main__':
     print(f"\n[{time.strftime('%H:%M:%S')}] Attempting to generate Manga image...")
     try:
         latest_manga = get_last_updated_media(media_type="MANGA")
-        manga_img = generate_image(latest_manga, media_type_for_log="MANGA")
-        output_manga_filename = "last_manga.png"
+        manga_img = generate_image(latest_manga, media_type_for_log="MANGA", scale=args.scale)
+        output_manga_filename = card_filename("MANGA", args.scale)
         manga_img.save(output_manga_filename, 'PNG')
         print(f"[{time.strftime('%H:%M:%S')}] Manga image saved as '{output_manga_filename}'")
     except Exception as e:
         print(f"[{time.strftime('%H:%M:%S')}] !!! CRITICAL ERROR generating Manga image: {e}")
         print(traceback.format_exc())
         
+    if FONTS.missing:
+        print(f"!!! SCRIPT: CUSTOM FONTS NOT FOUND: {', '.join(sorted(FONTS.missing))}. Fallback fonts were used. Place them in the script directory. !!!")
     print(f"\n[{time.strftime('%H:%M:%S')}] Static image generation script finished.")
\ No newline at end of file
@@ -0,0 +1,56 @@
+import atexit
+import contextvars
+import os
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", 16))
+
+UPSTREAM_FETCH_ENABLED = contextvars.ContextVar("upstream_fetch_enabled", default=True)
+
+_sessions = {}
+_sessions_pid = os.getpid()
+_lock = threading.Lock()
+
+
+def _new_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_MAXSIZE)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session(url):
+    global _sessions_pid
+    host = urlsplit(url).netloc
+    with _lock:
+        if os.getpid() != _sessions_pid:
+            _sessions.clear()
+            _sessions_pid = os.getpid()
+        session = _sessions.get(host)
+        if session is None:
+            session = _sessions[host] = _new_session()
+        return session
+
+
+def http_get(url, **kwargs):
+    return get_session(url).get(url, **kwargs)
+
+
+def http_post(url, **kwargs):
+    return get_session(url).post(url, **kwargs)
+
+
+def close_sessions():
+    with _lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
+
+
+atexit.register(close_sessions)
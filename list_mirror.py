@@ -0,0 +1,164 @@
+import os
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+    id INTEGER PRIMARY KEY,
+    type TEXT, format TEXT, title_romaji TEXT, title_english TEXT, cover_large TEXT, banner TEXT
+);
+CREATE TABLE IF NOT EXISTS entries (
+    username TEXT NOT NULL, media_id INTEGER NOT NULL, type TEXT NOT NULL,
+    status TEXT, progress INTEGER, score INTEGER, updated_at INTEGER NOT NULL, synced_at REAL,
+    PRIMARY KEY (username, media_id)
+);
+CREATE INDEX IF NOT EXISTS entries_by_update ON entries (username, type, updated_at DESC);
+CREATE INDEX IF NOT EXISTS entries_by_status ON entries (username, type, status, updated_at DESC);
+CREATE TABLE IF NOT EXISTS sync_state (
+    username TEXT PRIMARY KEY, last_sync REAL, last_full_sync REAL, requests INTEGER DEFAULT 0, changes INTEGER DEFAULT 0,
+    full_started REAL, cursor_type TEXT, cursor_page INTEGER
+);
+"""
+MIGRATIONS = {"entries": ["synced_at REAL"], "sync_state": ["full_started REAL", "cursor_type TEXT", "cursor_page INTEGER"]}
+MEDIA_TYPES = ("ANIME", "MANGA")
+
+
+class ListMirror:
+    def __init__(self, path, full_sync_interval=86400, full_page_size=50, delta_page_size=10):
+        self.path = path
+        self.full_sync_interval = full_sync_interval
+        self.full_page_size = full_page_size
+        self.delta_page_size = delta_page_size
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        if os.path.dirname(path): os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            for table, columns in MIGRATIONS.items():
+                existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+                for column in columns:
+                    if column.split()[0] not in existing: conn.execute(f"ALTER TABLE {table} ADD COLUMN {column}")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def last_sync(self, username):
+        row = self._connect().execute("SELECT last_sync FROM sync_state WHERE username = ?", (username.lower(),)).fetchone()
+        return row["last_sync"] if row else None
+
+    def ready(self, username):
+        row = self._connect().execute("SELECT last_full_sync FROM sync_state WHERE username = ?", (username.lower(),)).fetchone()
+        return row is not None and row["last_full_sync"] is not None
+
+    def sync_due(self, username, max_age):
+        row = self.stats(username); now = time.time()
+        if row is None or row["last_full_sync"] is None or row["full_started"] is not None: return True
+        return now - (row["last_sync"] or 0) >= max_age or now - row["last_full_sync"] > self.full_sync_interval
+
+    def sync(self, username, fetch_page):
+        key, now, state = username.lower(), time.time(), self.stats(username)
+        if state is None or state["full_started"] is not None or state["last_full_sync"] is None or now - state["last_full_sync"] > self.full_sync_interval:
+            return self._full_sync(key, username, fetch_page, state, now)
+        collected, requests = [], 0
+        for media_type in MEDIA_TYPES:
+            since, page = self._max_updated_at(key, media_type), 1
+            while True:
+                result = fetch_page(username, media_type, page, self.delta_page_size); requests += 1
+                if result is None: return None
+                entries, has_next = result
+                fresh = [e for e in entries if (e.get('updatedAt') or 0) >= since]
+                collected.extend((media_type, e) for e in fresh)
+                if not has_next or len(fresh) < len(entries): break
+                page += 1
+        with self._write_lock, self._connect() as conn:
+            changes = self._upsert(conn, key, collected, now)
+            conn.execute("UPDATE sync_state SET last_sync = ?, requests = requests + ?, changes = changes + ? WHERE username = ?", (now, requests, changes, key))
+        return changes
+
+    def _full_sync(self, key, username, fetch_page, state, now):
+        resume = state is not None and state["full_started"] is not None
+        started = state["full_started"] if resume else now
+        media_type, page = (state["cursor_type"], state["cursor_page"]) if resume else (MEDIA_TYPES[0], 1)
+        if not resume:
+            with self._write_lock, self._connect() as conn:
+                conn.execute("INSERT INTO sync_state (username, full_started, cursor_type, cursor_page) VALUES (?, ?, ?, ?) ON CONFLICT(username) DO UPDATE SET "
+                             "full_started=excluded.full_started, cursor_type=excluded.cursor_type, cursor_page=excluded.cursor_page", (key, started, media_type, page))
+        changes = 0
+        while media_type is not None:
+            result = fetch_page(username, media_type, page, self.full_page_size)
+            if result is None:
+                with self._write_lock, self._connect() as conn:
+                    conn.execute("UPDATE sync_state SET requests = requests + 1 WHERE username = ?", (key,))
+                return None
+            entries, has_next = result; page_type = media_type
+            following = MEDIA_TYPES[MEDIA_TYPES.index(media_type) + 1:]
+            media_type, page = (media_type, page + 1) if has_next else ((following[0], 1) if following else (None, None))
+            with self._write_lock, self._connect() as conn:
+                changes += self._upsert(conn, key, [(page_type, e) for e in entries], started)
+                conn.execute("UPDATE sync_state SET cursor_type = ?, cursor_page = ?, requests = requests + 1 WHERE username = ?", (media_type, page, key))
+        with self._write_lock, self._connect() as conn:
+            changes += conn.execute("DELETE FROM entries WHERE username = ? AND (synced_at IS NULL OR synced_at < ?)", (key, started)).rowcount
+            conn.execute("UPDATE sync_state SET last_sync = ?, last_full_sync = ?, full_started = NULL, cursor_type = NULL, cursor_page = NULL, changes = changes + ? "
+                         "WHERE username = ?", (now, now, changes, key))
+        return changes
+
+    def _max_updated_at(self, key, media_type):
+        row = self._connect().execute("SELECT MAX(updated_at) AS m FROM entries WHERE username = ? AND type = ?", (key, media_type)).fetchone()
+        return row["m"] or 0
+
+    def _upsert(self, conn, key, collected, synced_at):
+        changes = 0
+        for media_type, entry in collected:
+            media = entry.get('media') or {}
+            if media.get('id') is None: continue
+            title = media.get('title') or {}
+            conn.execute("INSERT INTO media (id, type, format, title_romaji, title_english, cover_large, banner) VALUES (?, ?, ?, ?, ?, ?, ?) "
+                         "ON CONFLICT(id) DO UPDATE SET type=excluded.type, format=excluded.format, title_romaji=excluded.title_romaji, "
+                         "title_english=excluded.title_english, cover_large=excluded.cover_large, banner=excluded.banner",
+                         (media['id'], media.get('type') or media_type, media.get('format'), title.get('romaji'), title.get('english'),
+                          (media.get('coverImage') or {}).get('large'), media.get('bannerImage')))
+            changes += conn.execute("INSERT INTO entries (username, media_id, type, status, progress, score, updated_at, synced_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                                    "ON CONFLICT(username, media_id) DO UPDATE SET type=excluded.type, status=excluded.status, progress=excluded.progress, "
+                                    "score=excluded.score, updated_at=excluded.updated_at "
+                                    "WHERE entries.updated_at != excluded.updated_at OR entries.progress IS NOT excluded.progress OR entries.status IS NOT excluded.status",
+                                    (key, media['id'], media_type, entry.get('status'), entry.get('progress'), entry.get('score'), entry.get('updatedAt') or 0, synced_at)).rowcount
+            conn.execute("UPDATE entries SET synced_at = ? WHERE username = ? AND media_id = ?", (synced_at, key, media['id']))
+        return changes
+
+    def _query_entries(self, where, params, limit=1):
+        return self._connect().execute(
+            "SELECT e.media_id, e.progress, e.score, e.updated_at, m.type, m.format, m.title_romaji, m.title_english, m.cover_large, m.banner "
+            f"FROM entries e JOIN media m ON m.id = e.media_id WHERE {where} ORDER BY e.updated_at DESC LIMIT ?", params + (limit,)).fetchall()
+
+    def _media(self, row, with_banner):
+        media = {"id": row["media_id"], "title": {"romaji": row["title_romaji"], "english": row["title_english"]}, "coverImage": {"large": row["cover_large"]}}
+        if with_banner: media["bannerImage"] = row["banner"]
+        media.update(type=row["type"], format=row["format"])
+        return media
+
+    def last_updated(self, username, media_type="ANIME"):
+        row = next(iter(self._query_entries("e.username = ? AND e.type = ?", (username.lower(), media_type))), None)
+        return {"updatedAt": row["updated_at"], "progress": row["progress"], "media": self._media(row, True)} if row else None
+
+    def completed_entries(self, username, limit, media_type="ANIME"):
+        rows = self._query_entries("e.username = ? AND e.type = ? AND e.status = 'COMPLETED'", (username.lower(), media_type), limit)
+        return [{"score": row["score"], "updatedAt": row["updated_at"], "media": self._media(row, False)} for row in rows]
+
+    def recently_completed(self, username, media_type="ANIME"):
+        entries = self.completed_entries(username, 1, media_type)
+        return entries[0] if entries else None
+
+    def completed_count(self, username, media_type="ANIME"):
+        return self._connect().execute("SELECT COUNT(*) FROM entries WHERE username = ? AND type = ? AND status = 'COMPLETED'",
+                                       (username.lower(), media_type)).fetchone()[0]
+
+    def stats(self, username):
+        row = self._connect().execute("SELECT * FROM sync_state WHERE username = ?", (username.lower(),)).fetchone()
+        return dict(row) if row else None
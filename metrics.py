@@ -0,0 +1,88 @@
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+class Metrics:
+    def __init__(self):
+        self.stages = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, ms):
+        with self._lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram()
+            histogram.observe(ms)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((stage, ms))
+
+    def error(self, stage):
+        with self._lock:
+            self.errors[stage] = self.errors.get(stage, 0) + 1
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.error(stage)
+            raise
+        finally:
+            self.observe(stage, (time.perf_counter() - start) * 1000)
+
+    def start_request(self):
+        return _request_timings.set([])
+
+    def finish_request(self, token):
+        timings = _request_timings.get() or []
+        _request_timings.reset(token)
+        totals = {}
+        for stage, ms in timings:
+            totals[stage] = totals.get(stage, 0.0) + ms
+        return totals
+
+    def render(self, gauges=()):
+        lines = ["# TYPE card_stage_duration_ms histogram"]
+        with self._lock:
+            for stage, histogram in sorted(self.stages.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+                    cumulative += count
+                    lines.append(f'card_stage_duration_ms_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'card_stage_duration_ms_sum{{stage="{stage}"}} {histogram.sum:.3f}')
+                lines.append(f'card_stage_duration_ms_count{{stage="{stage}"}} {histogram.count}')
+            lines.append("# TYPE card_stage_errors_total counter")
+            lines.extend(f'card_stage_errors_total{{stage="{stage}"}} {count}' for stage, count in sorted(self.errors.items()))
+        for name, labels, value in gauges:
+            label_text = ",".join(f'{key}="{val}"' for key, val in sorted(labels.items()))
+            lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def server_timing(totals):
+    return ", ".join(f"{stage};dur={ms:.1f}" for stage, ms in totals.items())
+
+
+METRICS = Metrics()
@@ -0,0 +1,86 @@
+import heapq
+import random
+import threading
+import time
+
+
+class PrerenderedCard:
+    def __init__(self, fingerprint, variants, rendered_at, complete=True):
+        self.fingerprint = fingerprint
+        self.variants = variants
+        self.complete = complete
+        self.rendered_at = rendered_at
+        self.checked_at = rendered_at
+
+
+class PrerenderScheduler:
+    def __init__(self, jobs, encode, jitter=0.1, max_age_factor=3):
+        self.jobs = jobs
+        self.encode = encode
+        self.jitter = jitter
+        self.max_age_factor = max_age_factor
+        self.renders = self.unchanged = self.failures = self.served = 0
+        self.last_error = None
+        self._cards = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="prerender", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def get(self, name, fmt):
+        card = self._cards.get(name)
+        if card is None or not card.complete or fmt not in card.variants:
+            return None
+        if time.monotonic() - card.checked_at > self.jobs[name][0] * self.max_age_factor:
+            return None
+        self.served += 1
+        return card.variants[fmt]
+
+    def refresh(self, name):
+        interval, build, encodings = self.jobs[name]
+        try:
+            fingerprint, render = build()
+            current = self._cards.get(name)
+            if current is not None and current.complete and current.fingerprint == fingerprint:
+                current.checked_at = time.monotonic()
+                self.unchanged += 1
+                return False
+            image = render()
+            variants = {fmt: (f"{fingerprint}.{fmt}", self.encode(image, fmt, **options)) for fmt, options in encodings}
+            self._cards[name] = PrerenderedCard(fingerprint, variants, time.monotonic(), not image.info.get("partial"))
+            self.renders += 1
+            return True
+        except Exception as e:
+            self.failures += 1
+            self.last_error = f"{name}: {e!r}"
+            return False
+
+    def stats(self):
+        now = time.monotonic()
+        return {"renders": self.renders, "unchanged": self.unchanged, "failures": self.failures, "served": self.served, "last_error": self.last_error,
+                "cards": {name: {"fingerprint": card.fingerprint, "age": round(now - card.rendered_at, 1), "complete": card.complete, "formats": sorted(card.variants)} for name, card in self._cards.items()}}
+
+    def _next_due(self, name, now):
+        return now + self.jobs[name][0] * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def _run(self):
+        now = time.monotonic()
+        queue = [(now + random.uniform(0, self.jitter), name) for name in self.jobs]
+        heapq.heapify(queue)
+        while queue and not self._stop.is_set():
+            due, name = queue[0]
+            if self._stop.wait(max(0.0, due - time.monotonic())):
+                break
+            heapq.heappop(queue)
+            self.refresh(name)
+            heapq.heappush(queue, (self._next_due(name, time.monotonic()), name))
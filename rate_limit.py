@@ -0,0 +1,61 @@
+import random
+import threading
+import time
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute=90, burst=None):
+        self.capacity = burst or rate_per_minute
+        self.fill_rate = rate_per_minute / 60.0
+        self.tokens = float(self.capacity)
+        self.remaining = None
+        self.blocked_until = 0.0
+        self.throttled = self.shed = 0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.fill_rate)
+        self._updated = now
+
+    def acquire(self, max_wait=0.0):
+        deadline = time.monotonic() + max_wait
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = max(self.blocked_until - now, (1 - self.tokens) / self.fill_rate)
+            if now + wait > deadline:
+                with self._lock:
+                    self.shed += 1
+                return False
+            time.sleep(wait)
+
+    def update_from_headers(self, status_code, headers):
+        remaining = _int_header(headers, "X-RateLimit-Remaining")
+        retry_after = _int_header(headers, "Retry-After")
+        with self._lock:
+            self._refill(time.monotonic())
+            if remaining is not None:
+                self.remaining = remaining
+                self.tokens = min(self.tokens, remaining)
+            if status_code == 429:
+                self.throttled += 1
+                self.tokens = 0
+                if retry_after is not None:
+                    self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+        return retry_after
+
+
+def _int_header(headers, name):
+    try:
+        return int(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, base=0.5, cap=8.0):
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
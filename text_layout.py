@@ -0,0 +1,85 @@
+from functools import lru_cache
+
+ELLIPSIS = "..."
+
+
+@lru_cache(maxsize=8192)
+def text_bbox(font, text):
+    return font.getbbox(text)
+
+
+def text_width(font, text):
+    bbox = text_bbox(font, text)
+    return bbox[2] - bbox[0]
+
+
+def text_height(font, text):
+    bbox = text_bbox(font, text)
+    return bbox[3] - bbox[1]
+
+
+def largest_fitting(lo, hi, fits):
+    best = lo
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        if fits(mid):
+            best, lo = mid, mid + 1
+        else:
+            hi = mid - 1
+    return best
+
+
+class LineSet:
+    __slots__ = ("font", "lines", "heights", "spacing", "height")
+
+    def __init__(self, font, lines, spacing=0):
+        self.font = font
+        self.lines = tuple(lines)
+        self.heights = tuple(text_height(font, line) for line in self.lines)
+        self.spacing = spacing
+        self.height = sum(self.heights) + spacing * max(0, len(self.lines) - 1)
+
+    def __len__(self):
+        return len(self.lines)
+
+    def draw(self, draw_ctx, x, y, fill):
+        for idx, (line, line_height) in enumerate(zip(self.lines, self.heights)):
+            draw_ctx.text((x, y), line, font=self.font, fill=fill)
+            y += line_height + (self.spacing if idx < len(self.lines) - 1 else 0)
+        return y
+
+
+@lru_cache(maxsize=1024)
+def truncate_line(font, text, max_width, min_chars=15):
+    if len(text) <= min_chars or text_width(font, text) <= max_width:
+        return LineSet(font, [text])
+    keep = largest_fitting(min_chars - len(ELLIPSIS), len(text) - 4, lambda k: text_width(font, text[:k] + ELLIPSIS) <= max_width)
+    return LineSet(font, [text[:keep] + ELLIPSIS])
+
+
+@lru_cache(maxsize=1024)
+def wrap_lines(font, text, max_width, max_lines, spacing=0):
+    lines, current_line, overflow = [], "", False
+    for word in text.split():
+        test_line = current_line + (" " if current_line else "") + word
+        if text_width(font, test_line) <= max_width:
+            current_line = test_line
+            continue
+        if current_line:
+            lines.append(current_line)
+        current_line = word
+        if text_width(font, word) > max_width and len(word.strip()) > 3:
+            keep = largest_fitting(3, len(word), lambda k: text_bbox(font, word[:k] + ELLIPSIS)[2] <= max_width)
+            lines.append(word[:keep] + ELLIPSIS)
+            current_line = ""
+            break
+        if len(lines) >= max_lines:
+            overflow = True
+            break
+    if current_line and not overflow:
+        lines.append(current_line)
+    if len(lines) > max_lines or overflow:
+        lines = lines[:max_lines]
+        if lines and len(lines[-1]) > 3 and not lines[-1].endswith(ELLIPSIS):
+            lines[-1] = lines[-1][:-3] + ELLIPSIS
+    return LineSet(font, lines, spacing)
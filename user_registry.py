@@ -0,0 +1,61 @@
+import threading
+from collections import OrderedDict
+
+from cache import TTLCache
+from rate_limit import TokenBucket
+
+
+class UserState:
+    def __init__(self, username, snapshot_max_stale, render_max_entries, render_ttl, rate_per_minute, rate_burst, snapshot_weigher=None):
+        self.username = username
+        self.snapshot_cache = TTLCache(max_entries=4, max_stale=snapshot_max_stale, weigher=snapshot_weigher)
+        self.render_cache = TTLCache(max_entries=render_max_entries, default_ttl=render_ttl, max_stale=0, weigher=len)
+        self.limiter = TokenBucket(rate_per_minute, rate_burst)
+
+    @property
+    def memory_bytes(self):
+        return self.snapshot_cache.total_weight + self.render_cache.total_weight
+
+
+class UserRegistry:
+    def __init__(self, factory, max_users=1000, memory_budget=64 * 1024 * 1024):
+        self.factory = factory
+        self.max_users = max_users
+        self.memory_budget = memory_budget
+        self.evictions = 0
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._users)
+
+    def __contains__(self, username):
+        return (username or "").lower() in self._users
+
+    def get(self, username):
+        key = (username or "").lower()
+        with self._lock:
+            state = self._users.get(key)
+            if state is None:
+                state = self._users[key] = self.factory(username)
+            self._users.move_to_end(key)
+            self._evict_cold_users(keep=key)
+            return state
+
+    def states(self):
+        with self._lock:
+            return list(self._users.values())
+
+    def memory_bytes(self):
+        with self._lock:
+            return sum(state.memory_bytes for state in self._users.values())
+
+    def _evict_cold_users(self, keep):
+        total = sum(state.memory_bytes for state in self._users.values())
+        while len(self._users) > 1 and (len(self._users) > self.max_users or total > self.memory_budget):
+            key, state = next(iter(self._users.items()))
+            if key == keep:
+                break
+            del self._users[key]
+            total -= state.memory_bytes
+            self.evictions += 1